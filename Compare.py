@@ -1,18 +1,109 @@
 import os
 import asyncio
 import json
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+import threading
+from prompt_registry import get_prompt, prompt_version
+from llm_cache import cache_key, cached_call_async, text_version
+from apis.cache import normalize_query
+from apis.clients import async_openai_client
+from apis import model_router
+from apis.resilience import guard
+from structured import parse_json, text_format
 
-load_dotenv()
+# Cache keys name the primary model even while the router falls back
+RESEARCH_MODEL = model_router.primary_model("research")
+COMPARE_MODEL = model_router.primary_model("compare")
 
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# At most this many items are researched at once per comparison
+RESEARCH_CONCURRENCY = int(os.getenv("COMPARE_RESEARCH_CONCURRENCY", 4))
+# Seconds before one item's research is given up on
+RESEARCH_TIMEOUT = float(os.getenv("COMPARE_RESEARCH_TIMEOUT", 45))
 
 
 # -------------------------------------------
-# STEP 1: Compile results using compare.txt
+# STEP 1: Research each item using search.txt
+# -------------------------------------------
+async def research_item(item_name: str, search_prompt: str):
+    key = cache_key(
+        "research",
+        RESEARCH_MODEL,
+        prompt_version("search"),
+        normalize_query(item_name),
+    )
+    return await cached_call_async(
+        key,
+        lambda: request_research(item_name, search_prompt),
+        should_cache=lambda result: "error" not in result,
+    )
+
+
+async def request_research(item_name: str, search_prompt: str):
+    messages = [
+        {"role": "system", "content": search_prompt},
+        {"role": "user", "content": f"Research this product: {item_name}"},
+    ]
+
+    route = model_router.route("research")
+    with guard("openai", "research"), route.timed():
+        response = await async_openai_client().responses.create(
+            model=route.model,
+            input=messages,
+            tools=[{"type": "web_search"}],
+        )
+    route.record_usage(response)
+
+    try:
+        # web_search answers are free text that should be JSON
+        return parse_json(response.output_text, "research")
+    except Exception as e:
+        return {"item": item_name, "error": f"Error parsing item research: {e}"}
+
+
+async def research_items(item_names: list[str], on_progress=None):
+    """Research every item; ``on_progress(item_name, result)`` fires as each finishes."""
+    search_prompt = get_prompt("search")
+    semaphore = asyncio.Semaphore(RESEARCH_CONCURRENCY)
+
+    async def research_one(item_name):
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(
+                    research_item(item_name, search_prompt), RESEARCH_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                result = {"item": item_name, "error": "Research timed out"}
+            except Exception as e:
+                print(f"Error researching {item_name}: {e}")
+                result = {"item": item_name, "error": "Research failed"}
+        if on_progress is not None:
+            # Callbacks may block (job progress is written to SQLite); keep
+            # them off the loop every comparison in the process shares
+            await asyncio.get_running_loop().run_in_executor(
+                None, on_progress, item_name, result
+            )
+        return result
+
+    return await asyncio.gather(*(research_one(name) for name in item_names))
+
+
+# -------------------------------------------
+# STEP 2: Compile results using compare2.txt
 # -------------------------------------------
 async def compile_comparison(item_results: list[dict], compare_prompt: str):
+    key = cache_key(
+        "compare",
+        COMPARE_MODEL,
+        text_version(compare_prompt),
+        item_results,
+    )
+    return await cached_call_async(
+        key,
+        lambda: request_comparison(item_results, compare_prompt),
+        should_cache=lambda result: "error" not in result,
+    )
+
+
+async def request_comparison(item_results: list[dict], compare_prompt: str):
     messages = [
         {"role": "system", "content": compare_prompt},
         {
@@ -21,50 +112,67 @@ async def compile_comparison(item_results: list[dict], compare_prompt: str):
         },
     ]
 
-    response = await client.responses.create(
-        model="gpt-4o",
-        input=messages,
-    )
-
-    raw_text = response.output_text.strip()
-
-    # Remove wrapping triple backticks if they exist
-    if raw_text.startswith("```") and raw_text.endswith("```"):
-        raw_text = "\n".join(raw_text.split("\n")[1:-1])
-
-    # Optionally remove any leading language specifier like 'json'
-    if raw_text.lower().startswith("json"):
-        raw_text = "\n".join(raw_text.split("\n")[1:])
+    route = model_router.route("compare")
+    with guard("openai", "compare"), route.timed():
+        response = await async_openai_client().responses.create(
+            model=route.model,
+            input=messages,
+            text=text_format("comparison"),
+        )
+    route.record_usage(response)
 
     try:
-        return json.loads(raw_text)
+        return parse_json(response.output_text, "compare")
     except Exception as e:
         return {
             "error": f"Error parsing final comparison: {e}",
-            "raw": raw_text,
+            "raw": response.output_text,
         }
 
 
 # -------------------------------------------
-# STEP 2: Main concurrent comparison function
+# STEP 3: Main concurrent comparison function
 # -------------------------------------------
-async def compare_items_concurrently(items: list[dict]):
-    # Load compare prompt
-    with open("prompts/compare2.txt", "r", encoding="utf-8") as f:
-        compare_prompt = f.read()
+async def compare_items_concurrently(items: list, on_progress=None):
+    """Compare items given as bare names or as already-researched dicts.
 
-    # Compile results into final comparison JSON
-    comparison = await compile_comparison(items, compare_prompt)
+    Names are researched concurrently; cached items skip research.
+    ``on_progress`` is passed through to ``research_items``.
+    """
+    # Loaded once at import by the prompt registry
+    compare_prompt = get_prompt("compare2")
 
-    # Print final compiled comparison for debugging
-    print("=== Final comparison JSON ===")
-    print(json.dumps(comparison, indent=2))
+    names = [item for item in items if isinstance(item, str)]
+    researched = iter(await research_items(names, on_progress)) if names else iter(())
+    item_results = [next(researched) if isinstance(item, str) else item for item in items]
 
-    return comparison
+    # Compile results into final comparison JSON
+    return await compile_comparison(item_results, compare_prompt)
 
 
 # -------------------------------------------
-# STEP 3: Sync wrapper
+# STEP 4: Sync wrapper
 # -------------------------------------------
-def get_comparison(items):
-    return asyncio.run(compare_items_concurrently(items))
+# One long-lived loop for the sync entry point. The shared AsyncOpenAI client
+# keeps its connection pool bound to the loop it was first used on, so a new
+# asyncio.run() per request breaks on the second comparison.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, daemon=True, name="compare-loop"
+            ).start()
+    return _loop
+
+
+def get_comparison(items, on_progress=None):
+    future = asyncio.run_coroutine_threadsafe(
+        compare_items_concurrently(items, on_progress), _background_loop()
+    )
+    return future.result()
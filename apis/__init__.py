@@ -1,5 +1,27 @@
 #  apis easy importing
+#
+# Submodules are imported on first use, so ``from apis.cache import ...``
+# does not pull in the OpenAI SDK or TextBlob.
 
-from .openai import summarize_reviews
-from .serp_api import search_serp_products
-from .sentiment import analyze_sentiment
\ No newline at end of file
+import importlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_EXPORTS = {
+    "summarize_reviews": ".openai",
+    "search_serp_products": ".serp_api",
+    "analyze_sentiment": ".sentiment",
+    "analyze_sentiment_batch": ".sentiment",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Directory for on-disk cache files, shared by every gunicorn worker on the host
+CACHE_DIR = os.getenv("CNZ_CACHE_DIR", ".cache")
+
+_MISSING = object()
+
+
+def normalize_query(text):
+    # Case-fold and collapse whitespace so "Sony  WH-1000XM5" == "sony wh-1000xm5"
+    return " ".join(str(text).casefold().split())
+
+
+class TTLCache:
+    """Two-tier cache: an in-process LRU in front of a SQLite file.
+
+    Values must be JSON serializable. ``None`` is a valid value and is used
+    for negative caching ("we looked, nothing was found"); it expires after
+    ``negative_ttl`` instead of ``ttl``. Expired entries are kept for another
+    ``stale_ttl`` seconds, invisible to ``get`` but returned by ``get_stale``
+    when the upstream cannot be reached.
+    """
+
+    def __init__(self, name, ttl, negative_ttl=None, max_entries=1024, disk=True, stale_ttl=0):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3") if disk else None
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "stale_hits": 0,
+        }
+
+    # ---------------------------
+    # Disk tier
+    # ---------------------------
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value TEXT, expires REAL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, key, stale=False):
+        try:
+            row = self._db().execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error ({self.name}): {e}")
+            return _MISSING, 0
+        oldest = time.time() - (self.stale_ttl if stale else 0)
+        if row is None or row[1] < oldest:
+            return _MISSING, 0
+        return json.loads(row[0]), row[1]
+
+    def _disk_set(self, key, value, expires):
+        try:
+            self._db().execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires),
+            )
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.name}): {e}")
+
+    # ---------------------------
+    # Memory tier
+    # ---------------------------
+    def _memory_get(self, key, stale=False):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires = entry
+            now = time.time()
+            if expires + self.stale_ttl < now:
+                del self._memory[key]
+                return _MISSING
+            if expires < now and not stale:
+                return _MISSING
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_set(self, key, value, expires):
+        with self._lock:
+            self._memory[key] = (value, expires)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        value = self._memory_get(key)
+        if value is not _MISSING:
+            return value, "memory"
+        if self.path:
+            value, expires = self._disk_get(key)
+            if value is not _MISSING:
+                self._memory_set(key, value, expires)
+                return value, "disk"
+        return _MISSING, None
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def get(self, key):
+        """Return ``(hit, value)``. ``hit`` is False when nothing is cached."""
+        value, tier = self._lookup(key)
+        if value is _MISSING:
+            self._count("misses")
+            return False, None
+        self._count(f"{tier}_hits", value)
+        return True, value
+
+    def peek(self, key):
+        """Like ``get``, but not counted: for re-checking a key ``get`` just missed."""
+        value, _ = self._lookup(key)
+        if value is _MISSING:
+            return False, None
+        return True, value
+
+    async def get_async(self, key):
+        """``get`` for event loops: memory hits inline, the SQLite read in a thread."""
+        value = self._memory_get(key)
+        if value is not _MISSING:
+            self._count("memory_hits", value)
+            return True, value
+        return await asyncio.to_thread(self.get, key)
+
+    def get_stale(self, key):
+        """Like ``get``, but entries up to ``stale_ttl`` past expiry still count."""
+        value = self._memory_get(key, stale=True)
+        if value is _MISSING and self.path:
+            value, _ = self._disk_get(key, stale=True)
+        if value is _MISSING:
+            return False, None
+        self._count("stale_hits", value)
+        return True, value
+
+    def set(self, key, value):
+        ttl = self.negative_ttl if value is None else self.ttl
+        expires = time.time() + ttl
+        self._memory_set(key, value, expires)
+        if self.path:
+            self._disk_set(key, value, expires)
+
+    async def set_async(self, key, value):
+        await asyncio.to_thread(self.set, key, value)
+
+    def get_or_set(self, key, fn):
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = fn()
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.path and os.path.exists(self.path):
+            self._db().execute("DELETE FROM entries")
+
+    def purge_expired(self):
+        if self.path:
+            self._db().execute(
+                "DELETE FROM entries WHERE expires < ?", (time.time() - self.stale_ttl,)
+            )
+
+    def _count(self, stat, value=_MISSING):
+        with self._lock:
+            self._stats[stat] += 1
+            if value is None:
+                self._stats["negative_hits"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
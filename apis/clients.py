@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+import weakref
+from .resilience import budget
+
+# One sync client per process, built on first use. Async clients keep their
+# connection pool bound to the event loop that first used them, so there is
+# one per loop (the ASGI server's and Compare's background loop).
+#
+# The SDK's own retries are off: each attempt would get the full timeout, and
+# its backoff honours Retry-After for up to a minute, so a call could take
+# several times OPENAI_TIMEOUT. A failed call goes to the breaker and the
+# stale-cache fallbacks instead, and the user can retry.
+_lock = threading.Lock()
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def openai_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import OpenAI
+
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    timeout=budget("openai").timeout,
+                    max_retries=0,
+                )
+    return _client
+
+
+def async_openai_client():
+    """The AsyncOpenAI client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                from openai import AsyncOpenAI
+
+                client = _async_clients[loop] = AsyncOpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    timeout=budget("openai").timeout,
+                    max_retries=0,
+                )
+    return client
+
+
+def preload():
+    """Import the OpenAI SDK without building a client.
+
+    Meant for a preforking server's master process (see gunicorn.conf.py):
+    the module code is then shared copy-on-write by every worker, while the
+    clients, and their sockets, are still created after the fork.
+    """
+    import openai  # noqa: F401
+
+
+def _reset_after_fork():
+    # A client inherited from the parent would share its connection pool
+    global _lock, _client, _async_clients
+    _lock = threading.Lock()
+    _client = None
+    _async_clients = weakref.WeakKeyDictionary()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import random
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from .resilience import budget, guard
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 15))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 20))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", 0.3))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry_delay(attempt, response=None):
+    # Exponential backoff plus random jitter, or the server's Retry-After
+    delay = BACKOFF * (2**attempt) + random.uniform(0, BACKOFF)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+
+def _attempt_timeout(deadline):
+    """``(connect, read)`` seconds for one attempt, or None once the budget is spent."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    return min(CONNECT_TIMEOUT, remaining), remaining
+
+
+def _can_retry(attempt, deadline, delay):
+    # Retry only if a backoff still leaves time for another attempt
+    return attempt < MAX_RETRIES and time.monotonic() + delay < deadline
+
+
+# ---------------------------
+# Sync client (requests)
+# ---------------------------
+def _build_session():
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Keep-alive connections are reused across requests and threads
+SESSION = _build_session()
+
+
+def read_timeout(upstream):
+    # SerpAPI and other named upstreams have their own latency budget
+    return budget(upstream).timeout if upstream != "http" else READ_TIMEOUT
+
+
+def get(url, params=None, upstream="http", call_site="http"):
+    """GET with retries on connection errors and 429/5xx.
+
+    The upstream's timeout bounds the whole call, retries and backoff
+    included: each attempt gets what is left of it.
+    """
+    deadline = time.monotonic() + read_timeout(upstream)
+    with guard(upstream, call_site) as call:
+        for attempt in range(MAX_RETRIES + 1):
+            timeout = _attempt_timeout(deadline)
+            if timeout is None:
+                raise requests.Timeout(f"{upstream} budget spent after {attempt} attempts")
+            try:
+                response = SESSION.get(url, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = _retry_delay(attempt)
+                if not _can_retry(attempt, deadline, delay):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = _retry_delay(attempt, response)
+                if not _can_retry(attempt, deadline, delay):
+                    # Hand the last 429/5xx back to the caller
+                    call.fail()
+                    return response
+            time.sleep(delay)
+
+
+# ---------------------------
+# Async client (httpx)
+# ---------------------------
+ASYNC_CLIENT = httpx.AsyncClient(
+    timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+)
+
+
+async def async_get(url, params=None, upstream="http", call_site="http"):
+    """Async ``get``, with the same retries and overall time budget."""
+    deadline = time.monotonic() + read_timeout(upstream)
+    with guard(upstream, call_site) as call:
+        for attempt in range(MAX_RETRIES + 1):
+            timeout = _attempt_timeout(deadline)
+            if timeout is None:
+                raise httpx.TimeoutException(f"{upstream} budget spent after {attempt} attempts")
+            connect, read = timeout
+            try:
+                response = await ASYNC_CLIENT.get(
+                    url, params=params, timeout=httpx.Timeout(read, connect=connect)
+                )
+            except httpx.TransportError:
+                delay = _retry_delay(attempt)
+                if not _can_retry(attempt, deadline, delay):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = _retry_delay(attempt, response)
+                if not _can_retry(attempt, deadline, delay):
+                    call.fail()
+                    return response
+            await asyncio.sleep(delay)
@@ -0,0 +1,204 @@
+"""Process-local counters and histograms, rendered in Prometheus text format.
+
+Each worker keeps its own numbers; scrape every worker (or run one process
+in async mode) to see everything. Recording is a lock plus a few additions,
+cheap enough for the hot path.
+"""
+
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# METRICS_TRACE=1 logs one line per request with its upstream calls
+TRACE = os.getenv("METRICS_TRACE", "").lower() in ("1", "true", "yes")
+
+_trace_spans = contextvars.ContextVar("trace_spans", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels):
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if series is None:
+                return {"count": 0, "sum": 0.0, "buckets": [0] * (len(self.buckets) + 1)}
+            return {"count": series[2], "sum": series[1], "buckets": list(series[0])}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}"
+                    )
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name, help_text):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name, help_text)
+        return _registry[name]
+
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, help_text, buckets)
+        return _registry[name]
+
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# Standard metrics
+# ---------------------------
+REQUEST_SECONDS = histogram("http_request_duration_seconds", "Time spent serving a route.")
+UPSTREAM_SECONDS = histogram("upstream_request_duration_seconds", "Time spent in an upstream API call.")
+UPSTREAM_ERRORS = counter("upstream_errors_total", "Upstream API calls that raised.")
+TOKENS = counter("llm_tokens_total", "Tokens reported by the OpenAI API.")
+
+
+@contextmanager
+def observe_upstream(upstream, call_site):
+    """Time one upstream call, e.g. ``observe_upstream("openai", "chatbot")``."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        UPSTREAM_ERRORS.inc(upstream=upstream, call_site=call_site)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_SECONDS.observe(elapsed, upstream=upstream, call_site=call_site)
+        spans = _trace_spans.get()
+        if spans is not None:
+            spans.append((f"{upstream}:{call_site}", round(elapsed * 1000, 1)))
+
+
+def usage_tokens(response):
+    """``(input, output)`` tokens of a Responses or Chat Completions result."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0
+    # Responses API uses input/output, Chat Completions prompt/completion
+    prompt = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", 0) or 0
+    return prompt, completion
+
+
+def record_usage(call_site, model, response):
+    """Count tokens from a Responses or Chat Completions result."""
+    if getattr(response, "usage", None) is None:
+        return
+    prompt, completion = usage_tokens(response)
+    TOKENS.inc(prompt, call_site=call_site, model=model, kind="input")
+    TOKENS.inc(completion, call_site=call_site, model=model, kind="output")
+
+
+# ---------------------------
+# Per-request timing and traces
+# ---------------------------
+def start_request():
+    """Call at the start of a request; returns a token for ``finish_request``."""
+    spans = [] if TRACE else None
+    return time.perf_counter(), _trace_spans.set(spans)
+
+
+def finish_request(token, route, method, status):
+    start, trace_token = token
+    elapsed = time.perf_counter() - start
+    REQUEST_SECONDS.observe(elapsed, route=route, method=method, status=status)
+    spans = _trace_spans.get()
+    _trace_spans.reset(trace_token)
+    if spans is not None:
+        print(
+            "trace "
+            + json.dumps(
+                {
+                    "route": route,
+                    "method": method,
+                    "status": status,
+                    "ms": round(elapsed * 1000, 1),
+                    "upstream": spans,
+                }
+            )
+        )
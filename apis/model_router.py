@@ -0,0 +1,240 @@
+"""Which model each LLM call site uses, with a latency SLO fallback.
+
+Call sites ask ``route("shopping_list")`` for a ``Route`` instead of
+hard-coding a model. Each site has a policy: the tier it normally uses, the
+faster tier to fall back to and a p95 latency budget. When the p95 of the
+site's recent calls on its primary tier goes over budget, the site switches
+to the fallback tier for ``FALLBACK_SECONDS``, then tries the primary again.
+Sites already on the fastest tier have no fallback.
+
+    route = model_router.route("shopping_list")
+    with guard("openai", route.call_site), route.timed():
+        response = openai_client().chat.completions.create(model=route.model, ...)
+    route.record_usage(response)
+
+Tiers, fallbacks and budgets can be changed per site without code changes:
+``MODEL_FAST`` / ``MODEL_STRONG`` pick the models, ``MODEL_TIER_<SITE>``,
+``MODEL_FALLBACK_<SITE>`` (``none`` disables it) and ``MODEL_SLO_<SITE>``
+(seconds, ``0`` disables it) override one site, e.g. ``MODEL_TIER_COMPARE=fast``.
+
+State is per process, like ``apis.resilience``.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from .metrics import counter, histogram, record_usage, usage_tokens
+
+# USD per million (input, output) tokens; models not listed are not costed
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+# Fastest first; a site only ever falls back to a faster tier
+TIERS = {
+    "fast": os.getenv("MODEL_FAST", "gpt-4o-mini"),
+    "strong": os.getenv("MODEL_STRONG", "gpt-4o"),
+}
+
+# p95 is taken over the last SLO_WINDOW calls no older than SLO_WINDOW_SECONDS
+SLO_WINDOW = int(os.getenv("MODEL_SLO_WINDOW", 50))
+SLO_WINDOW_SECONDS = float(os.getenv("MODEL_SLO_WINDOW_SECONDS", 300))
+SLO_MIN_CALLS = int(os.getenv("MODEL_SLO_MIN_CALLS", 10))
+FALLBACK_SECONDS = float(os.getenv("MODEL_FALLBACK_SECONDS", 120))
+
+CALL_SECONDS = histogram(
+    "llm_call_duration_seconds", "Model call latency, by call site and tier."
+)
+COST = counter("llm_cost_usd_total", "Estimated model spend from token usage, by call site and tier.")
+SWITCHES = counter("model_tier_switches_total", "Call sites moved to another tier, by new tier.")
+ESCALATIONS = counter(
+    "model_escalations_total", "Calls redone on a stronger tier after the first answer."
+)
+
+
+class Policy:
+    """``tier`` normally; ``fallback`` while its p95 is over ``slo`` seconds."""
+
+    def __init__(self, tier, fallback=None, slo=None, escalate_to=None):
+        self.tier = tier
+        self.fallback = fallback
+        self.slo = slo
+        # Tier that call sites may redo an answer on (see Route.escalate)
+        self.escalate_to = escalate_to
+
+
+def _policy(call_site, tier, fallback=None, slo=None, escalate_to=None):
+    name = call_site.upper()
+    tier = os.getenv(f"MODEL_TIER_{name}", tier)
+    fallback = os.getenv(f"MODEL_FALLBACK_{name}", fallback)
+    if fallback in ("", "none") or fallback == tier:
+        fallback = None
+    slo = float(os.getenv(f"MODEL_SLO_{name}", slo or 0)) or None
+    for value in (tier, fallback):
+        if value is not None and value not in TIERS:
+            raise ValueError(f"Unknown model tier for {call_site}: {value!r}")
+    order = list(TIERS)
+    if fallback is not None and order.index(fallback) > order.index(tier):
+        # A slower, pricier model is no cure for a slow site
+        raise ValueError(f"Fallback for {call_site} must be faster than {tier}, not {fallback}")
+    return Policy(tier, fallback, slo, escalate_to)
+
+
+POLICIES = {
+    # Clarifying questions; recommendation turns are escalated by chatbot.py.
+    # Already on the fastest tier, so there is nothing to fall back to
+    "chatbot": _policy("chatbot", "fast", escalate_to="strong"),
+    "chatbot_stream": _policy("chatbot_stream", "fast", escalate_to="strong"),
+    "chatbot_speculative": _policy("chatbot_speculative", "fast", escalate_to="strong"),
+    # One item and a 1-6 word reason, usually served from a prefetched buffer
+    "shopping_list": _policy("shopping_list", "fast"),
+    "summarize_reviews": _policy("summarize_reviews", "fast"),
+    "summarize_reviews_batch": _policy("summarize_reviews_batch", "fast"),
+    # Web search dominates; keep under COMPARE_RESEARCH_TIMEOUT
+    "research": _policy("research", "strong", "fast", slo=35),
+    "compare": _policy("compare", "strong", "fast", slo=25),
+}
+DEFAULT_POLICY = Policy("strong")
+
+
+def policy(call_site):
+    return POLICIES.get(call_site, DEFAULT_POLICY)
+
+
+def primary_model(call_site):
+    """The model a site normally uses, for cache keys and metadata."""
+    return TIERS[policy(call_site).tier]
+
+
+def cost(model, response):
+    prices = PRICES.get(model)
+    if prices is None:
+        return 0.0
+    prompt, completion = usage_tokens(response)
+    return (prompt * prices[0] + completion * prices[1]) / 1_000_000
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class _Site:
+    def __init__(self, call_site):
+        self.call_site = call_site
+        self.policy = policy(call_site)
+        self._latencies = deque(maxlen=SLO_WINDOW)  # (finished_at, seconds), primary tier only
+        self._fallback_until = 0.0
+        self._lock = threading.Lock()
+
+    def tier(self):
+        if self.policy.fallback and time.monotonic() < self._fallback_until:
+            return self.policy.fallback
+        return self.policy.tier
+
+    def observe(self, tier, seconds):
+        if tier != self.policy.tier or not self.policy.slo or not self.policy.fallback:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._fallback_until:
+                # Admitted before the switch
+                return
+            self._latencies.append((now, seconds))
+            while self._latencies[0][0] < now - SLO_WINDOW_SECONDS:
+                self._latencies.popleft()
+            if len(self._latencies) < SLO_MIN_CALLS:
+                return
+            p95 = percentile([s for _, s in self._latencies], 0.95)
+            if p95 <= self.policy.slo:
+                return
+            self._fallback_until = now + FALLBACK_SECONDS
+            # The primary starts from a clean window when it comes back
+            self._latencies.clear()
+        SWITCHES.inc(call_site=self.call_site, tier=self.policy.fallback)
+        print(
+            f"{self.call_site}: p95 {p95:.1f}s over {self.policy.slo:g}s on "
+            f"{self.policy.tier}, using {self.policy.fallback} for {FALLBACK_SECONDS:.0f}s"
+        )
+
+    def stats(self):
+        with self._lock:
+            latencies = [s for _, s in self._latencies]
+            retry_in = self._fallback_until - time.monotonic()
+        return {
+            "tier": self.tier(),
+            "model": TIERS[self.tier()],
+            "primary": self.policy.tier,
+            "fallback": self.policy.fallback,
+            "slo_p95": self.policy.slo,
+            "recent_calls": len(latencies),
+            "recent_p95": round(percentile(latencies, 0.95), 3) if latencies else None,
+            "fallback_for": round(max(retry_in, 0.0), 1),
+        }
+
+
+class Route:
+    """The tier and model one call should use; times the call and prices its usage."""
+
+    def __init__(self, site, tier):
+        self._site = site
+        self.call_site = site.call_site
+        self.tier = tier
+        self.model = TIERS[tier]
+
+    @contextmanager
+    def timed(self):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            # Failures and timeouts count too: they are what the user waited
+            elapsed = time.perf_counter() - start
+            CALL_SECONDS.observe(elapsed, call_site=self.call_site, tier=self.tier, model=self.model)
+            self._site.observe(self.tier, elapsed)
+
+    def record_usage(self, response):
+        record_usage(self.call_site, self.model, response)
+        COST.inc(cost(self.model, response), call_site=self.call_site, tier=self.tier, model=self.model)
+
+    def escalate(self):
+        """A route on the policy's ``escalate_to`` tier, or None if this already is one."""
+        target = self._site.policy.escalate_to
+        if target is None or target == self.tier:
+            return None
+        ESCALATIONS.inc(call_site=self.call_site, tier=target)
+        return Route(self._site, target)
+
+
+_sites = {}
+_registry_lock = threading.Lock()
+
+
+def _site(call_site):
+    with _registry_lock:
+        if call_site not in _sites:
+            _sites[call_site] = _Site(call_site)
+        return _sites[call_site]
+
+
+def route(call_site):
+    site = _site(call_site)
+    return Route(site, site.tier())
+
+
+def stats():
+    for call_site in POLICIES:
+        _site(call_site)
+    with _registry_lock:
+        sites = dict(_sites)
+    return {
+        "tiers": TIERS,
+        "call_sites": {call_site: site.stats() for call_site, site in sites.items()},
+    }
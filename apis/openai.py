@@ -1,15 +1,44 @@
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from structured import parse_json, response_format
+from .clients import openai_client
+from . import model_router
+from .resilience import guard
 
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Part of the summary cache key; the primary model even during a fallback
+MODEL = model_router.primary_model("summarize_reviews_batch")
 
 def summarize_reviews(reviews):
     prompt = f"Summarize the following product reviews:\n{reviews}"
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
+    route = model_router.route("summarize_reviews")
+    with guard("openai", "summarize_reviews"), route.timed():
+        response = openai_client().chat.completions.create(
+            model=route.model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+    route.record_usage(response)
     return response.choices[0].message.content
+
+def summarize_reviews_batch(products):
+    """Summarize several products' reviews in one request.
+
+    ``products`` is a list of ``(name, reviews)`` pairs. Returns the summaries
+    in the same order; a product the model skipped gets ``""``.
+    """
+    sections = "\n\n".join(
+        f"### {index}: {name}\n{reviews}" for index, (name, reviews) in enumerate(products)
+    )
+    prompt = (
+        "Summarize the following product reviews separately for each product. "
+        "Return one summary per product id.\n\n" + sections
+    )
+    route = model_router.route("summarize_reviews_batch")
+    with guard("openai", "summarize_reviews_batch"), route.timed():
+        response = openai_client().chat.completions.create(
+            model=route.model,
+            messages=[{"role": "user", "content": prompt}],
+            # Strict structured output: one summary per product id
+            response_format=response_format("review_summaries"),
+        )
+    route.record_usage(response)
+    data = parse_json(response.choices[0].message.content, "summarize_reviews_batch")
+    by_id = {entry["id"]: entry["summary"] for entry in data.get("summaries", [])}
+    return [by_id.get(index, "") for index in range(len(products))]
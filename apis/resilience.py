@@ -0,0 +1,355 @@
+"""Latency budgets, circuit breakers and admission control for upstream calls.
+
+Every OpenAI and SerpAPI call goes through ``guard(upstream, call_site)``,
+which replaces a bare ``observe_upstream``. Before the call it checks the
+upstream's breaker and takes an admission slot; either can refuse, raising
+``UpstreamUnavailable`` at once, so a slow or failing upstream costs callers
+microseconds instead of a full timeout. Callers with a cache then serve a
+stale answer (``TTLCache.get_stale``), the others fail fast.
+
+State is per process, like ``apis.metrics``: each gunicorn worker trips its
+own breakers and has its own admission slots.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from .metrics import counter, observe_upstream
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+class Budget:
+    """``timeout``: cut-off for a whole call, retries included; ``slow_after``: counts as slow."""
+
+    def __init__(self, timeout, slow_after, max_concurrency):
+        self.timeout = timeout
+        self.slow_after = slow_after
+        self.max_concurrency = max_concurrency
+
+
+BUDGETS = {
+    # Comparison research with web search is the slowest call; keep in step
+    # with COMPARE_RESEARCH_TIMEOUT
+    "openai": Budget(
+        timeout=_env_float("OPENAI_TIMEOUT", 45),
+        slow_after=_env_float("OPENAI_SLOW_AFTER", 20),
+        max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", 100)),
+    ),
+    "serpapi": Budget(
+        timeout=_env_float("SERPAPI_TIMEOUT", os.getenv("HTTP_READ_TIMEOUT", 15)),
+        slow_after=_env_float("SERPAPI_SLOW_AFTER", 4),
+        max_concurrency=int(os.getenv("SERPAPI_MAX_CONCURRENCY", 40)),
+    ),
+}
+DEFAULT_BUDGET = Budget(timeout=15, slow_after=5, max_concurrency=40)
+
+# Call sites that are slow by design get their own threshold; the others use
+# their upstream's slow_after
+SLOW_AFTER = {
+    ("openai", "research"): _env_float("OPENAI_RESEARCH_SLOW_AFTER", 40),
+    ("openai", "compare"): _env_float("OPENAI_COMPARE_SLOW_AFTER", 30),
+}
+
+# Breaker settings, shared by every upstream
+WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+WINDOW_SECONDS = _env_float("BREAKER_WINDOW_SECONDS", 60)
+MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 5))
+FAILURE_RATE = _env_float("BREAKER_FAILURE_RATE", 0.5)
+SLOW_RATE = _env_float("BREAKER_SLOW_RATE", 0.8)
+COOLDOWN = _env_float("BREAKER_COOLDOWN", 30)
+
+REJECTED = counter(
+    "upstream_rejected_total", "Upstream calls refused before being sent, by reason."
+)
+TRANSITIONS = counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes, by new state."
+)
+STALE_SERVED = counter(
+    "stale_served_total", "Expired cache entries served because the upstream call failed."
+)
+
+
+def budget(upstream):
+    return BUDGETS.get(upstream, DEFAULT_BUDGET)
+
+
+def slow_after(upstream, call_site):
+    return SLOW_AFTER.get((upstream, call_site), budget(upstream).slow_after)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream whose breaker is open or that is at capacity."""
+
+    def __init__(self, upstream, reason, retry_after=1.0):
+        super().__init__(f"{upstream} unavailable ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed -> open -> half-open breaker over a rolling window of calls.
+
+    Opens when at least ``min_calls`` recent calls (the last ``window``, no
+    older than ``window_seconds``) include ``failure_rate`` failures or
+    ``slow_rate`` calls slower than ``slow_after``; ``None`` turns either
+    check off. After ``cooldown`` seconds one probe call is let through
+    (half-open): success closes the breaker, anything else opens it again.
+
+    ``guard`` uses two kinds: one per upstream that only counts failures,
+    and one per ``(upstream, call_site)`` that only counts slow calls, so a
+    call site that is slow by nature (web-search research) cannot shut the
+    fast ones out of the same upstream.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        upstream,
+        slow_after=None,
+        call_site=None,
+        window=WINDOW,
+        window_seconds=WINDOW_SECONDS,
+        min_calls=MIN_CALLS,
+        failure_rate=FAILURE_RATE,
+        slow_rate=SLOW_RATE,
+        cooldown=COOLDOWN,
+    ):
+        self.upstream = upstream
+        self.call_site = call_site
+        self.slow_after = slow_after
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._calls = deque(maxlen=window)  # (finished_at, failed, slow)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise ``UpstreamUnavailable`` unless a call may go out now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise UpstreamUnavailable(self.upstream, "circuit_open", max(remaining, 1.0))
+
+    def record(self, failed, elapsed):
+        now = time.monotonic()
+        failed = failed and self.failure_rate is not None
+        slow = self.slow_after is not None and elapsed > self.slow_after
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._calls.clear()
+                    self._transition(self.CLOSED)
+                return
+            if self.state == self.OPEN:
+                # A call admitted before the breaker opened
+                return
+            self._calls.append((now, failed, slow))
+            while self._calls and self._calls[0][0] < now - self.window_seconds:
+                self._calls.popleft()
+            calls = len(self._calls)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slow_calls = sum(1 for _, _, s in self._calls if s)
+            if (self.failure_rate is not None and failures / calls >= self.failure_rate) or (
+                self.slow_after is not None and slow_calls / calls >= self.slow_rate
+            ):
+                self._open(now)
+
+    def release_probe(self):
+        # The probe never got a result (cancelled); let the next call probe
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            calls = list(self._calls)
+            state = self.state
+            retry_in = self._opened_at + self.cooldown - time.monotonic()
+        return {
+            "state": state,
+            "recent_calls": len(calls),
+            "recent_failures": sum(1 for _, f, _ in calls if f),
+            "recent_slow": sum(1 for _, _, s in calls if s),
+            "retry_in": round(max(retry_in, 0.0), 1) if state == self.OPEN else 0.0,
+        }
+
+    # Callers hold self._lock
+    def _open(self, now):
+        self._opened_at = now
+        self._calls.clear()
+        self._transition(self.OPEN)
+
+    def _transition(self, state):
+        self.state = state
+        if self.call_site is None:
+            TRANSITIONS.inc(upstream=self.upstream, state=state)
+            print(f"Circuit breaker for {self.upstream} is now {state}")
+        else:
+            TRANSITIONS.inc(upstream=self.upstream, call_site=self.call_site, state=state)
+            print(f"Latency breaker for {self.upstream}/{self.call_site} is now {state}")
+
+
+class Admission:
+    """At most ``limit`` calls in flight; the next one is refused, not queued."""
+
+    def __init__(self, upstream, limit):
+        self.upstream = upstream
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+_breakers = {}
+_latency_breakers = {}
+_admissions = {}
+_registry_lock = threading.Lock()
+
+
+def breaker(upstream):
+    """The upstream's failure breaker."""
+    with _registry_lock:
+        if upstream not in _breakers:
+            _breakers[upstream] = CircuitBreaker(upstream)
+            _admissions[upstream] = Admission(upstream, budget(upstream).max_concurrency)
+        return _breakers[upstream]
+
+
+def latency_breaker(upstream, call_site):
+    """The breaker that opens when one call site's calls are mostly slow."""
+    key = (upstream, call_site)
+    with _registry_lock:
+        if key not in _latency_breakers:
+            _latency_breakers[key] = CircuitBreaker(
+                upstream, slow_after(upstream, call_site), call_site, failure_rate=None
+            )
+        return _latency_breakers[key]
+
+
+class _Call:
+    """Handle yielded by ``guard``; ``fail()`` marks a call that returned an error."""
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+def _counts_as_failure(error):
+    # 4xx other than 429 is a bad request on our side, not an unhealthy upstream
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+
+@contextmanager
+def guard(upstream, call_site):
+    """Breaker, admission slot and timing around one upstream call.
+
+    Usable from sync and async code alike (nothing here blocks). Raises
+    ``UpstreamUnavailable`` without calling the upstream when the breaker
+    is open or ``max_concurrency`` calls are already in flight.
+    """
+    circuits = [breaker(upstream), latency_breaker(upstream, call_site)]
+    admission = _admissions[upstream]
+    for index, circuit in enumerate(circuits):
+        try:
+            circuit.before_call()
+        except UpstreamUnavailable:
+            for admitted in circuits[:index]:
+                admitted.release_probe()
+            REJECTED.inc(upstream=upstream, call_site=call_site, reason="circuit_open")
+            raise
+    if not admission.acquire():
+        for circuit in circuits:
+            circuit.release_probe()
+        REJECTED.inc(upstream=upstream, call_site=call_site, reason="overloaded")
+        raise UpstreamUnavailable(upstream, "overloaded")
+
+    call = _Call()
+    start = time.perf_counter()
+    outcome = None
+    try:
+        with observe_upstream(upstream, call_site):
+            yield call
+        outcome = call.failed
+    except Exception as e:
+        outcome = _counts_as_failure(e)
+        raise
+    finally:
+        admission.release()
+        elapsed = time.perf_counter() - start
+        for circuit in circuits:
+            if outcome is not None:
+                circuit.record(outcome, elapsed)
+            elif circuit.slow_after is not None and elapsed > circuit.slow_after:
+                # Cancelled by a caller's own timeout: slow, not failed
+                circuit.record(False, elapsed)
+            else:
+                circuit.release_probe()
+
+
+def serve_stale(cache, key):
+    """``(hit, value)`` from ``cache`` ignoring expiry, for when the upstream failed."""
+    hit, value = cache.get_stale(key)
+    if hit:
+        STALE_SERVED.inc(cache=cache.name)
+    return hit, value
+
+
+def stats():
+    with _registry_lock:
+        upstreams = list(_breakers)
+        latency = dict(_latency_breakers)
+    result = {}
+    for upstream in upstreams:
+        admission = _admissions[upstream]
+        result[upstream] = {
+            **_breakers[upstream].stats(),
+            "in_flight": admission.in_flight,
+            "peak_in_flight": admission.peak,
+            "max_concurrency": admission.limit,
+            "timeout": budget(upstream).timeout,
+            "call_sites": {
+                call_site: {**circuit.stats(), "slow_after": circuit.slow_after}
+                for (name, call_site), circuit in latency.items()
+                if name == upstream
+            },
+        }
+    return result
@@ -17,22 +17,131 @@
 #     return summary
 
 
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from .cache import TTLCache, normalize_query
 from .serp_api import search_serp_products
-from .openai import summarize_reviews
+from .openai import MODEL, summarize_reviews_batch
+from .tokens import count_tokens, truncate_tokens
 
-def fetch_product_reviews(product_name):
-    data = search_serp_products(product_name)
-    if not data or "shopping_results" not in data:
-        return ["No reviews found."]
+# Review text sent per product, and per packed summarization request
+TOKENS_PER_PRODUCT = int(os.getenv("REVIEW_TOKENS_PER_PRODUCT", 400))
+TOKENS_PER_REQUEST = int(os.getenv("REVIEW_TOKENS_PER_REQUEST", 2400))
 
-    snippets = []
-    for result in data["shopping_results"]:
-        if "snippet" in result:
-            snippets.append(result["snippet"])
+# Keyed by the snippet set, so a product is re-summarized only when its reviews change
+SUMMARY_CACHE = TTLCache(
+    "review_summaries",
+    ttl=int(os.getenv("REVIEW_SUMMARY_TTL", 7 * 24 * 3600)),
+    max_entries=1024,
+)
 
-    return snippets if snippets else ["No reviews available."]
+# SerpAPI searches and packed summarization calls for one batch run side by side
+REVIEW_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("REVIEW_POOL_SIZE", 8)),
+    thread_name_prefix="reviews",
+)
+
+NO_REVIEWS = "No reviews found."
+# Stands in for one product's summary when its packed request failed
+NO_SUMMARY = "Review summary unavailable right now."
 
 def get_review_summary_for_product(product_name):
-    reviews = fetch_product_reviews(product_name)
-    combined_reviews = "\n".join(reviews)
-    return summarize_reviews(combined_reviews)
+    return get_review_summaries([product_name])[product_name]
+
+# ---------------------------
+# Batch pipeline
+# ---------------------------
+def fetch_snippets(product_name):
+    try:
+        data = search_serp_products(product_name)
+    except Exception as e:
+        # Only this product goes without reviews, not the whole batch
+        print(f"Review search failed for {product_name}: {e}")
+        return []
+    if not data:
+        return []
+    return [r["snippet"] for r in data.get("shopping_results", []) if "snippet" in r]
+
+def prepare_snippets(snippets, budget=TOKENS_PER_PRODUCT):
+    """Drop duplicate snippets and keep as many as fit in ``budget`` tokens.
+
+    The snippet that crosses the budget is truncated to what is left of it.
+    """
+    kept, seen, used = [], set(), 0
+    for snippet in snippets:
+        key = normalize_query(snippet)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        tokens = count_tokens(snippet)
+        if used + tokens > budget:
+            # Cut the one that overflows, so a single long review still counts
+            snippet = truncate_tokens(snippet, budget - used)
+            if snippet:
+                kept.append(snippet)
+                used += count_tokens(snippet)
+            break
+        kept.append(snippet)
+        used += tokens
+    return kept, used
+
+def summary_key(snippets):
+    canonical = json.dumps(sorted(normalize_query(s) for s in snippets))
+    return f"{MODEL}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+def pack_requests(products, budget=TOKENS_PER_REQUEST):
+    """Group ``(name, snippets, tokens)`` entries into requests of at most ``budget`` tokens."""
+    packs, current, used = [], [], 0
+    for product in products:
+        if current and used + product[2] > budget:
+            packs.append(current)
+            current, used = [], 0
+        current.append(product)
+        used += product[2]
+    if current:
+        packs.append(current)
+    return packs
+
+def summarize_pack(pack):
+    try:
+        summaries = summarize_reviews_batch(
+            [(name, "\n".join(snippets)) for name, snippets, _ in pack]
+        )
+    except Exception as e:
+        # The other packs' summaries still go out; these are retried next time
+        print(f"Review summarization failed for {len(pack)} products: {e}")
+        return [NO_SUMMARY] * len(pack)
+    for (_, snippets, _), summary in zip(pack, summaries):
+        # A product the model skipped is retried next time instead of cached
+        if summary:
+            SUMMARY_CACHE.set(summary_key(snippets), summary)
+    return summaries
+
+def get_review_summaries(product_names):
+    """Summaries for many products: ``{name: summary}``.
+
+    SerpAPI results are fetched concurrently, snippets are deduped and cut to
+    ``TOKENS_PER_PRODUCT``, cached summaries are reused, and the remaining
+    products are packed several to a request and summarized concurrently.
+    """
+    names = list(dict.fromkeys(product_names))
+    results = {}
+    pending = []
+    for name, snippets in zip(names, REVIEW_POOL.map(fetch_snippets, names)):
+        snippets, tokens = prepare_snippets(snippets)
+        if not snippets:
+            results[name] = NO_REVIEWS
+            continue
+        hit, summary = SUMMARY_CACHE.get(summary_key(snippets))
+        if hit:
+            results[name] = summary
+        else:
+            pending.append((name, snippets, tokens))
+
+    packs = pack_requests(pending)
+    for pack, summaries in zip(packs, REVIEW_POOL.map(summarize_pack, packs)):
+        for (name, _, _), summary in zip(pack, summaries):
+            results[name] = summary
+    return {name: results[name] for name in product_names}
@@ -1,5 +1,160 @@
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
 from textblob import TextBlob
+from textblob._text import EMOTICONS, PUNCTUATION, RE_EMOTICONS
+from textblob.en import sentiment as _pattern_lexicon
 
 def analyze_sentiment(text):
     blob = TextBlob(text)
     return blob.sentiment.polarity  # Range: -1 to 1
+
+# ---------------------------
+# Batch scoring
+# ---------------------------
+# Same rules as TextBlob's pattern analyzer (lexicon, "very"/"-ly" modifiers,
+# "not" negation, "!" boost, emoticons), with the lexicon compiled once into
+# plain lookups instead of TextBlob's lazily loaded nested dicts.
+
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+_PUNCTUATION = frozenset(PUNCTUATION)
+_LEADING = tuple(PUNCTUATION.replace(".", ""))
+_TRAILING = _LEADING + (".",)
+_SARCASM = re.compile(r"\( ?\! ?\)")
+_QUOTES = str.maketrans({q: f" {q} " for q in "“”‘’'\""})
+
+_lexicon_lock = threading.Lock()
+_lexicon = None
+
+# Polarity by snippet; review snippets repeat a lot across searches
+MEMO_SIZE = 8192
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+def _compile_lexicon():
+    """word -> (polarity, intensity, is_modifier), built once per process."""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            if dict.__len__(_pattern_lexicon) == 0:
+                _pattern_lexicon.load()
+            words = {}
+            for word, senses in dict.items(_pattern_lexicon):
+                polarity, _, intensity = senses[None]
+                words[word] = (polarity, intensity, "RB" in senses)
+            emoticons = {
+                face.lower(): polarity
+                for (_, polarity), faces in EMOTICONS.items()
+                for face in faces
+            }
+            _lexicon = (words, emoticons)
+    return _lexicon
+
+def tokenize(text):
+    """Lower-cased tokens, split the way TextBlob splits them for sentiment."""
+    text = _SARCASM.sub(" (!) ", text.replace("n't", " n't")).translate(_QUOTES)
+    tokens = []
+    for token in text.split():
+        if token == "(!)":
+            tokens.append(token)
+            continue
+        while token.startswith(_LEADING):
+            tokens.append(token[0])
+            token = token[1:]
+        tail = []
+        while token.endswith(_TRAILING):
+            if token.endswith("..."):
+                tail.append("...")
+                token = token[:-3].rstrip(".")
+            else:
+                tail.append(token[-1])
+                token = token[:-1]
+        if token:
+            tokens.append(token)
+        tokens.extend(reversed(tail))
+    # Emoticons split above (": )") are glued back together (":)")
+    text = RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), " ".join(tokens))
+    return text.lower().split()
+
+def _assess(tokens, words, emoticons):
+    """Polarity of each assessed chunk; a port of ``Sentiment.assessments``."""
+    chunks = []  # [polarity, intensity, negated]
+    modifier = None
+    negation = None
+    for w in tokens:
+        entry = words.get(w)
+        if entry is not None:
+            polarity, intensity, is_modifier = entry
+            if modifier is None:
+                chunks.append([polarity, intensity, False])
+            else:
+                # "very good": the modifier's intensity scales this word
+                last = chunks[-1]
+                last[0] = max(-1.0, min(polarity * last[1], 1.0))
+                last[1] = intensity
+            if negation is not None:
+                chunks[-1][1] = 1.0 / chunks[-1][1]
+                chunks[-1][2] = True
+            modifier = w if is_modifier else None
+            negation = w if w in NEGATIONS else None
+            continue
+
+        if w in NEGATIONS:
+            negation = w
+        elif negation and len(w.strip("'")) > 1:
+            negation = None
+        if negation is not None and modifier is not None and modifier.endswith("ly"):
+            # "really not good"
+            chunks[-1][2] = True
+            negation = None
+        elif modifier and len(w) > 2:
+            modifier = None
+        if w == "!" and chunks:
+            chunks[-1][0] = max(-1.0, min(chunks[-1][0] * 1.25, 1.0))
+        if w == "(!)":
+            chunks.append([0.0, 1.0, False])
+        if not w.isalpha() and len(w) <= 5 and w not in _PUNCTUATION:
+            polarity = emoticons.get(w)
+            if polarity is not None:
+                chunks.append([polarity, 1.0, False])
+    # "not good" = slightly bad, "not bad" = slightly good
+    return [p * -0.5 if negated else p for p, _, negated in chunks]
+
+def analyze_sentiment_batch(texts):
+    """Polarity (-1 to 1) for every text, matching ``analyze_sentiment``.
+
+    Repeated texts, within the batch or seen before, are scored once.
+    """
+    texts = list(texts)
+    scores = {}
+    with _memo_lock:
+        for text in texts:
+            if text in _memo:
+                _memo.move_to_end(text)
+                scores[text] = _memo[text]
+    pending = [text for text in dict.fromkeys(texts) if text not in scores]
+
+    if pending:
+        words, emoticons = _compile_lexicon()
+        assessed = [_assess(tokenize(text), words, emoticons) for text in pending]
+        counts = np.array([len(a) for a in assessed])
+        flat = np.fromiter(
+            (p for a in assessed for p in a), dtype=np.float64, count=int(counts.sum())
+        )
+        # Mean per text; texts without a known word score 0.0, as in TextBlob
+        sums = np.zeros(len(pending))
+        nonempty = counts > 0
+        if flat.size:
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums[nonempty] = np.add.reduceat(flat, offsets[nonempty])
+        means = sums / np.maximum(counts, 1)
+
+        with _memo_lock:
+            for text, score in zip(pending, means.tolist()):
+                scores[text] = score
+                _memo[text] = score
+            while len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+
+    return [scores[text] for text in texts]
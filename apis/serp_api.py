@@ -1,36 +1,133 @@
+import asyncio
+import httpx
 import requests
 import os
-from dotenv import load_dotenv
+from . import http_client
+from concurrent.futures import ThreadPoolExecutor
+from .cache import TTLCache, normalize_query
+from .resilience import UpstreamUnavailable, serve_stale
+from .singleflight import SingleFlight
 
-load_dotenv()
+# Image URLs rarely change; "no image found" is retried sooner
+IMAGE_CACHE = TTLCache(
+    "serp_images",
+    ttl=int(os.getenv("SERP_IMAGE_CACHE_TTL", 7 * 24 * 3600)),
+    negative_ttl=int(os.getenv("SERP_IMAGE_NEGATIVE_TTL", 6 * 3600)),
+    max_entries=2048,
+    stale_ttl=int(os.getenv("SERP_IMAGE_STALE_TTL", 30 * 24 * 3600)),
+)
+
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search.json")
+
+# Concurrent lookups for the same query share one SerpAPI request
+IMAGE_FLIGHTS = SingleFlight("serp_images", lock_timeout=30)
+SEARCH_FLIGHTS = SingleFlight("serp_search")
+
+# Shared pool for batch image lookups, bounded so one page can't flood SerpAPI
+IMAGE_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SERP_IMAGE_POOL_SIZE", 8)),
+    thread_name_prefix="serp-image",
+)
 
 def search_serp_products(query):
-    url = "https://serpapi.com/search.json"
+    return SEARCH_FLIGHTS.do(
+        normalize_query(query), lambda: fetch_serp_products(query)
+    )
+
+def fetch_serp_products(query):
+    url = SERPAPI_URL
     params = {
         "q": query,
         "engine": "google_shopping",
         "api_key": os.getenv("SERPAPI_KEY")
     }
-    response = requests.get(url, params=params)
+    response = http_client.get(url, params=params, upstream="serpapi", call_site="search")
     if response.status_code == 200:
         return response.json()
     return None
 
 def get_serp_image_url(product_name):
-    url = "https://serpapi.com/search.json"
+    key = normalize_query(product_name)
+    hit, image_url = IMAGE_CACHE.get(key)
+    if hit:
+        return image_url
+
+    def fetch_and_store():
+        try:
+            image_url = fetch_serp_image_url(key)
+        except (requests.exceptions.RequestException, UpstreamUnavailable) as e:
+            # Upstream errors are not cached, only real "no image found" answers
+            print(f"Error fetching image from SerpAPI: {e}")
+            return serve_stale(IMAGE_CACHE, key)[1]
+        IMAGE_CACHE.set(key, image_url)
+        return image_url
+
+    return IMAGE_FLIGHTS.do(key, fetch_and_store, recheck=lambda: IMAGE_CACHE.peek(key))
+
+def get_serp_image_urls(product_names):
+    # Same product twice on one page only costs one lookup
+    unique = list(dict.fromkeys(normalize_query(name) for name in product_names))
+    urls = dict(zip(unique, IMAGE_POOL.map(get_serp_image_url, unique)))
+    return {name: urls[normalize_query(name)] for name in product_names}
+
+async def get_serp_image_url_async(product_name):
+    key = normalize_query(product_name)
+    # Cache reads and writes that reach SQLite run in threads, off the loop
+    hit, image_url = await IMAGE_CACHE.get_async(key)
+    if hit:
+        return image_url
+
+    async def fetch_and_store():
+        try:
+            image_url = await fetch_serp_image_url_async(key)
+        except (httpx.HTTPError, UpstreamUnavailable) as e:
+            print(f"Error fetching image from SerpAPI: {e}")
+            return (await asyncio.to_thread(serve_stale, IMAGE_CACHE, key))[1]
+        await IMAGE_CACHE.set_async(key, image_url)
+        return image_url
+
+    return await IMAGE_FLIGHTS.do_async(
+        key, fetch_and_store, recheck=lambda: IMAGE_CACHE.peek(key)
+    )
+
+async def get_serp_image_urls_async(product_names):
+    unique = list(dict.fromkeys(normalize_query(name) for name in product_names))
+    found = await asyncio.gather(*(get_serp_image_url_async(name) for name in unique))
+    urls = dict(zip(unique, found))
+    return {name: urls[normalize_query(name)] for name in product_names}
+
+def get_image_cache_stats():
+    stats = IMAGE_CACHE.stats()
+    stats["singleflight"] = IMAGE_FLIGHTS.stats()
+    return stats
+
+def fetch_serp_image_url(product_name):
+    url = SERPAPI_URL
     params = {
         "q": product_name,
         "tbm": "isch",  # Image search
         "ijn": "0",     # First page of results
         "api_key": os.getenv("SERPAPI_KEY")
     }
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        if "images_results" in data and len(data["images_results"]) > 0:
-            return data["images_results"][0].get("original")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching image from SerpAPI: {e}")
-        return None
+    response = http_client.get(url, params=params, upstream="serpapi", call_site="images")
+    response.raise_for_status()
+    data = response.json()
+    if "images_results" in data and len(data["images_results"]) > 0:
+        return data["images_results"][0].get("original")
+    return None
+
+async def fetch_serp_image_url_async(product_name):
+    params = {
+        "q": product_name,
+        "tbm": "isch",
+        "ijn": "0",
+        "api_key": os.getenv("SERPAPI_KEY")
+    }
+    response = await http_client.async_get(
+        SERPAPI_URL, params=params, upstream="serpapi", call_site="images"
+    )
+    response.raise_for_status()
+    data = response.json()
+    if "images_results" in data and len(data["images_results"]) > 0:
+        return data["images_results"][0].get("original")
+    return None
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from .cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+# How often a leader retries a lock another worker holds
+LOCK_POLL_INTERVAL = 0.05
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one upstream call.
+
+    Inside a process, the first caller (the leader) runs ``fn`` and everyone
+    else waits on its future, from any thread or event loop. When a
+    ``recheck`` is given, the leader also takes a per-key file lock so
+    leaders in other gunicorn workers queue behind each other (only leaders
+    for the same key; the file is removed on release). After getting
+    the lock it calls ``recheck()``, which should return ``(hit, value)``
+    from a shared cache without counting a second miss (``TTLCache.peek``),
+    so only the first worker reaches the upstream. Followers wait at most
+    ``lock_timeout`` for the leader, then make the call themselves; if the
+    leader is cancelled, one of them takes over.
+    """
+
+    def __init__(self, name, lock_timeout=60):
+        self.name = name
+        self.lock_timeout = lock_timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "coalesced": 0, "shared_hits": 0, "follower_timeouts": 0}
+
+    def _join(self, key):
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._flights[key] = future
+            self._stats["leaders"] += 1
+            return future, True
+
+    def _finish(self, key, future, value=None, error=None):
+        with self._lock:
+            self._flights.pop(key, None)
+        if isinstance(error, asyncio.CancelledError):
+            # Not the followers' error: they retry (see _leader_cancelled)
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    @staticmethod
+    def _leader_cancelled(future):
+        # A follower's own cancellation must still propagate
+        task = asyncio.current_task()
+        return future.cancelled() and not (task and task.cancelling())
+
+    # ---------------------------
+    # Cross-process lock
+    # ---------------------------
+    def _lock_path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(LOCK_DIR, f"{self.name}-{digest}.lock")
+
+    def _try_file_lock(self, key):
+        """An fd holding ``key``'s lock, or None if another worker has it."""
+        path = self._lock_path(key)
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # The previous holder unlinks the file before unlocking it; a lock
+            # on that unlinked file excludes nobody, so try the new one again
+            held, current = os.fstat(fd), os.stat(path)
+            if (held.st_dev, held.st_ino) == (current.st_dev, current.st_ino):
+                return fd
+        except (BlockingIOError, FileNotFoundError):
+            pass
+        os.close(fd)
+        return None
+
+    def _acquire_file_lock(self, key):
+        if fcntl is None:
+            return None
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            fd = self._try_file_lock(key)
+            if fd is not None:
+                return fd
+            if time.monotonic() > deadline:
+                # Stuck holder: go upstream rather than wait forever
+                return None
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    async def _acquire_file_lock_async(self, key):
+        # Polled on the loop rather than in a thread, so a cancelled caller
+        # stops waiting at once and never ends up holding a lock it forgot
+        if fcntl is None:
+            return None
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            fd = self._try_file_lock(key)
+            if fd is not None:
+                return fd
+            if time.monotonic() > deadline:
+                return None
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    def _release_file_lock(self, key, fd):
+        if fd is None:
+            return
+        # Removed while still locked, so lock files do not pile up per key
+        try:
+            os.unlink(self._lock_path(key))
+        except FileNotFoundError:
+            pass
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _follower_timed_out(self, key):
+        with self._lock:
+            self._stats["follower_timeouts"] += 1
+        print(f"{self.name}: no answer for a coalesced call after {self.lock_timeout}s, calling it again")
+
+    def _recheck(self, recheck):
+        hit, value = recheck()
+        if hit:
+            with self._lock:
+                self._stats["shared_hits"] += 1
+        return hit, value
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def do(self, key, fn, recheck=None):
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return future.result(timeout=self.lock_timeout)
+            except TimeoutError:
+                # Stuck leader: same as a stuck lock holder
+                self._follower_timed_out(key)
+                return fn()
+            except CancelledError:
+                return self.do(key, fn, recheck)
+
+        fd = None
+        try:
+            if recheck:
+                fd = self._acquire_file_lock(key)
+                hit, value = self._recheck(recheck)
+            else:
+                hit, value = False, None
+            if not hit:
+                value = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        finally:
+            self._release_file_lock(key, fd)
+        self._finish(key, future, value)
+        return value
+
+    async def do_async(self, key, fn, recheck=None):
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                # Shielded: one follower giving up must not cancel the leader's future
+                return await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)), self.lock_timeout
+                )
+            except TimeoutError:
+                self._follower_timed_out(key)
+                return await fn()
+            except asyncio.CancelledError:
+                if not self._leader_cancelled(future):
+                    raise
+                return await self.do_async(key, fn, recheck)
+
+        fd = None
+        try:
+            if recheck:
+                fd = await self._acquire_file_lock_async(key)
+                # A shared-cache read: SQLite, so not on the loop
+                hit, value = await asyncio.to_thread(self._recheck, recheck)
+            else:
+                hit, value = False, None
+            if not hit:
+                value = await fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        finally:
+            self._release_file_lock(key, fd)
+        self._finish(key, future, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._flights)
+        return stats
@@ -0,0 +1,98 @@
+import time
+import pytest
+from apis import resilience
+from apis.resilience import Admission, CircuitBreaker, UpstreamUnavailable
+
+
+def failure_breaker(**overrides):
+    settings = dict(window=10, window_seconds=60, min_calls=4, failure_rate=0.5, cooldown=0.1)
+    return CircuitBreaker("test", **{**settings, **overrides})
+
+
+def test_breaker_opens_once_enough_calls_fail():
+    breaker = failure_breaker()
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED  # under min_calls
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamUnavailable) as refused:
+        breaker.before_call()
+    assert refused.value.reason == "circuit_open"
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = failure_breaker(min_calls=1)
+    breaker.record(True, 0.1)
+    time.sleep(0.15)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()  # the probe is still out
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_opens_again():
+    breaker = failure_breaker(min_calls=1)
+    breaker.record(True, 0.1)
+    time.sleep(0.15)
+    breaker.before_call()
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = failure_breaker(min_calls=1)
+    breaker.record(True, 0.1)
+    time.sleep(0.15)
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_latency_breaker_ignores_failures_and_opens_on_slow_calls():
+    breaker = failure_breaker(failure_rate=None, slow_after=1.0, slow_rate=0.5)
+    for _ in range(4):
+        breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    for _ in range(4):
+        breaker.record(False, 2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_admission_refuses_past_the_limit():
+    admission = Admission("test", limit=2)
+    assert admission.acquire() and admission.acquire()
+    assert not admission.acquire()
+    admission.release()
+    assert admission.acquire()
+    assert admission.peak == 2
+
+
+def test_slow_call_site_does_not_shut_out_the_upstream(monkeypatch):
+    monkeypatch.setitem(resilience.SLOW_AFTER, ("slowtest", "research"), 0.0)
+    for _ in range(resilience.MIN_CALLS):
+        with resilience.guard("slowtest", "research"):
+            pass
+    assert resilience.latency_breaker("slowtest", "research").state == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamUnavailable):
+        with resilience.guard("slowtest", "research"):
+            pass
+    with resilience.guard("slowtest", "chatbot"):
+        pass
+    assert resilience.breaker("slowtest").state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_do_not_count_as_failures():
+    class BadRequest(Exception):
+        status_code = 400
+
+    for _ in range(resilience.MIN_CALLS):
+        with pytest.raises(BadRequest):
+            with resilience.guard("badrequest", "test"):
+                raise BadRequest()
+    assert resilience.breaker("badrequest").state == CircuitBreaker.CLOSED
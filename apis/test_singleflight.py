@@ -0,0 +1,130 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from apis import singleflight
+from apis.singleflight import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def lock_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(singleflight, "LOCK_DIR", str(tmp_path))
+    return tmp_path
+
+
+def miss():
+    return False, None
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flights = SingleFlight("test")
+    calls = []
+    started = threading.Event()
+
+    def fn():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", fn, recheck=miss)))
+    leader.start()
+    started.wait()
+    followers = [
+        threading.Thread(target=lambda: results.append(flights.do("k", fn, recheck=miss)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert flights.stats()["coalesced"] == 4
+
+
+def test_recheck_hit_skips_the_call():
+    flights = SingleFlight("test")
+    assert flights.do("k", lambda: pytest.fail("called"), recheck=lambda: (True, "cached")) == "cached"
+    assert flights.stats()["shared_hits"] == 1
+
+
+def test_cancelled_leader_frees_the_key_and_its_lock(lock_dir):
+    flights = SingleFlight("test", lock_timeout=5)
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do_async("k", slow, recheck=miss))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(flights.do_async("k", slow, recheck=miss))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The follower takes over instead of inheriting the cancellation
+        assert await follower == "value"
+        start = time.monotonic()
+        assert await flights.do_async("k", slow, recheck=miss) == "value"
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    assert elapsed < 1
+    assert len(calls) == 3
+    assert flights.stats()["in_flight"] == 0
+    assert os.listdir(lock_dir) == []
+
+
+def test_cancelled_leader_waiting_for_the_lock(lock_dir):
+    flights = SingleFlight("test", lock_timeout=5)
+    held = flights._try_file_lock("k")  # another worker's leader
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do_async("k", lambda: None, recheck=miss))
+        await asyncio.sleep(0.1)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+    assert flights.stats()["in_flight"] == 0
+    flights._release_file_lock("k", held)
+    assert flights._try_file_lock("k") is not None
+
+
+def test_distinct_keys_do_not_wait_for_each_other():
+    flights = SingleFlight("test")
+
+    async def slow():
+        await asyncio.sleep(0.3)
+        return "value"
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(
+            *(flights.do_async(f"product {i}", slow, recheck=miss) for i in range(50))
+        )
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) < 0.6
+
+
+def test_follower_gives_up_on_a_stuck_leader():
+    flights = SingleFlight("test", lock_timeout=0.2)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flights.do("k", release.wait))
+    leader.start()
+    time.sleep(0.05)
+    try:
+        assert flights.do("k", lambda: "own") == "own"
+        assert flights.stats()["follower_timeouts"] == 1
+    finally:
+        release.set()
+        leader.join()
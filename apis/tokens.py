@@ -0,0 +1,47 @@
+"""Token counting shared by history compaction and review packing."""
+
+import threading
+
+_encoding = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def _get_encoding():
+    # Loaded on first use rather than at import: tiktoken downloads its BPE
+    # file unless TIKTOKEN_CACHE_DIR has it (the Docker image pre-fetches
+    # it). When that fails, fall back to the usual ~4 characters per token
+    # estimate for the life of the process.
+    global _encoding, _loaded
+    if _loaded:
+        return _encoding
+    with _load_lock:
+        if not _loaded:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                print(f"tiktoken unavailable, estimating token counts: {e}")
+            _loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text, budget):
+    """The start of ``text``, cut to at most ``budget`` tokens."""
+    if budget <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= budget else encoding.decode(tokens[:budget])
+    return text[: budget * 4]
@@ -0,0 +1,237 @@
+"""Async serving mode.
+
+The slow, upstream-bound API routes are served natively async, so one
+process can keep hundreds of OpenAI/SerpAPI calls in flight on a single
+event loop with shared long-lived clients. Every other route (pages,
+static files, streaming, stats) is handed to the Flask app unchanged.
+
+Nothing that can block on SQLite runs on the loop itself. The conversation
+and job stores go through ``run_in_threadpool``. Cache lookups that miss
+memory use ``TTLCache.get_async`` / ``set_async``. Suggestion refills run
+on their own pool, and the async path only touches in-memory buffers.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import math
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import main
+import speculation
+from apis import metrics
+from apis.resilience import UpstreamUnavailable
+from chatbot import ai_bot_response_async
+from Compare import compare_items_concurrently
+from conversation_store import new_session_id
+from apis.serp_api import get_serp_image_url_async, get_serp_image_urls_async
+
+flask_app = main.app
+# Seconds between store reads while streaming a comparison job's progress
+JOB_POLL_INTERVAL = 0.5
+
+
+# -------------------------------------------
+# Flask session cookie, read and written here
+# -------------------------------------------
+def load_session(request):
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if cookie:
+        try:
+            max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+            return serializer.loads(cookie, max_age=max_age)
+        except Exception:
+            pass
+    return {}
+
+
+def get_session_id(request):
+    """Return ``(sid, cookie_value)``; ``cookie_value`` is set for new sessions."""
+    data = load_session(request)
+    if data.get("sid"):
+        return data["sid"], None
+    data["sid"] = new_session_id()
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    return data["sid"], serializer.dumps(data)
+
+
+def with_session_cookie(response, cookie):
+    if cookie:
+        response.set_cookie(
+            flask_app.config["SESSION_COOKIE_NAME"],
+            cookie,
+            httponly=True,
+            samesite=flask_app.config["SESSION_COOKIE_SAMESITE"],
+            secure=flask_app.config["SESSION_COOKIE_SECURE"],
+        )
+    return response
+
+
+# -------------------------------------------
+# Async routes (same contracts as main.py)
+# -------------------------------------------
+async def get_response(request):
+    data = await request.json()
+    user_input = data.get("user_input")
+    sid, cookie = get_session_id(request)
+    conversation_history = await run_in_threadpool(main.conversations.get, sid)
+
+    # May wait on a speculative call still in flight
+    bot_response = await run_in_threadpool(
+        speculation.take_turn, sid, user_input, conversation_history
+    )
+    if bot_response is None:
+        bot_response = await ai_bot_response_async(user_input, conversation_history)
+
+    await run_in_threadpool(main.record_turn, sid, user_input, bot_response)
+    await run_in_threadpool(
+        speculation.speculate, sid, data.get("context"), bot_response, main.conversations.get
+    )
+    return with_session_cookie(JSONResponse({"response": bot_response}), cookie)
+
+
+async def compare_items(request):
+    data = await request.json()
+    items = data.get("items", [])
+
+    try:
+        return JSONResponse(await compare_items_concurrently(items))
+    except UpstreamUnavailable as e:
+        return await upstream_unavailable(request, e)
+    except Exception as e:
+        print(f"Error during comparison: {e}")
+        return JSONResponse({"error": "An unexpected error occurred."}, status_code=500)
+
+
+async def stream_compare_job(request):
+    """Server-sent events for one comparison job.
+
+    Emits a ``progress`` event whenever the job changes and one final
+    ``result`` (the comparison JSON) or ``error`` event. Only served here:
+    waiting between polls would tie up a whole WSGI worker per comparison.
+    """
+    job_id = request.path_params["job_id"]
+    if await run_in_threadpool(main.compare_jobs.get, job_id) is None:
+        return JSONResponse({"error": "Unknown or expired job"}, status_code=404)
+
+    async def generate():
+        last = None
+        while True:
+            job = await run_in_threadpool(main.compare_jobs.get, job_id)
+            if job is None:
+                yield main.sse("error", {"error": "Unknown or expired job"})
+                return
+            if job["status"] == "done":
+                yield main.sse("result", job["result"])
+                return
+            if job["status"] == "failed":
+                yield main.sse("error", {"error": job["error"]})
+                return
+            progress = {"status": job["status"], **job["progress"]}
+            if progress != last:
+                yield main.sse("progress", progress)
+                last = progress
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def get_shopping_list_item(request):
+    data = await request.json()
+    event = data.get("event")
+    rejected = data.get("rejected", [])
+    accepted = data.get("accepted", [])
+    sid, cookie = get_session_id(request)
+    try:
+        # Served from the session's buffer; only a cold buffer waits on the model
+        item = await main.suggestion_buffers.next_item_async(sid, event, accepted, rejected)
+    except TimeoutError:
+        return JSONResponse({"error": main.SUGGESTION_TIMEOUT_ERROR}, status_code=504)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    return with_session_cookie(JSONResponse(item), cookie)
+
+
+async def get_image_serp(request):
+    item_name = request.query_params.get("item_name")
+    if not item_name:
+        return JSONResponse({"error": "Missing item_name parameter"}, status_code=400)
+    image_url = await get_serp_image_url_async(item_name)
+    if image_url:
+        return JSONResponse({"image_url": image_url})
+    return JSONResponse({"image_url": None}, status_code=404)
+
+
+async def get_images_serp(request):
+    data = await request.json()
+    item_names = data.get("item_names") if isinstance(data, dict) else None
+    if not isinstance(item_names, list) or not item_names:
+        return JSONResponse({"error": "Missing item_names list"}, status_code=400)
+    if len(item_names) > main.MAX_BATCH_IMAGES:
+        return JSONResponse(
+            {"error": f"At most {main.MAX_BATCH_IMAGES} items per request"},
+            status_code=400,
+        )
+    images = await get_serp_image_urls_async([str(name) for name in item_names])
+    return JSONResponse({"images": images})
+
+
+async def upstream_unavailable(request, e):
+    return JSONResponse(
+        {"error": "The service is busy, please try again shortly."},
+        status_code=503,
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+ASYNC_ROUTES = [
+    Route("/get_response", get_response, methods=["POST"]),
+    Route("/compare-items", compare_items, methods=["POST"]),
+    Route("/compare-jobs/{job_id}/events", stream_compare_job, methods=["GET"]),
+    Route("/get_shopping_list_item", get_shopping_list_item, methods=["POST"]),
+    Route("/get_image_serp", get_image_serp, methods=["GET"]),
+    Route("/get_images_serp", get_images_serp, methods=["POST"]),
+]
+
+
+class RequestTimingMiddleware:
+    """Times the async routes; Flask's own hooks time everything it serves."""
+
+    def __init__(self, app):
+        self.app = app
+        self.paths = {route.path for route in ASYNC_ROUTES}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        token = metrics.start_request()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.finish_request(token, scope["path"], scope["method"], status)
+
+
+app = RequestTimingMiddleware(
+    Starlette(
+        routes=[*ASYNC_ROUTES, Mount("/", app=WsgiToAsgi(flask_app))],
+        exception_handlers={UpstreamUnavailable: upstream_unavailable},
+    )
+)
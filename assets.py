@@ -0,0 +1,267 @@
+"""Fingerprinted, precompressed static assets.
+
+``python assets.py build`` copies every asset the templates reference
+through ``asset_url(...)``, and everything their stylesheets ``url()``, into
+static/dist under content-hashed names (style.css -> style.1a2b3c4d5e.css).
+Text files get ``.gz`` and, with the ``brotli`` package installed, ``.br``
+variants. OpenType/TrueType fonts in ``@font-face`` rules are converted to
+WOFF2 Latin subsets (needs ``fonttools`` and ``brotli``), so only the faces
+the CSS declares are shipped, at a fraction of their size. ``manifest.json``
+maps each source path to its built name.
+
+At runtime ``asset_url("styles/style.css")`` returns the fingerprinted URL,
+which main.py serves with a one-year immutable Cache-Control and the
+precompressed variant the browser accepts. Without a manifest (a checkout
+that was never built) or with ``ASSETS_DISABLED=1`` it returns the plain
+/static URL.
+
+    python assets.py build
+    python assets.py build --no-fonts    # skip the WOFF2 conversion
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+TEMPLATES_DIR = os.path.join(ROOT, "templates")
+DIST_DIR = os.getenv("ASSETS_DIST_DIR", os.path.join(STATIC_DIR, "dist"))
+MANIFEST_NAME = "manifest.json"
+MANIFEST_PATH = os.path.join(DIST_DIR, MANIFEST_NAME)
+DISABLED = os.getenv("ASSETS_DISABLED", "").lower() in ("1", "true", "yes")
+
+URL_PREFIX = "/assets/"
+# Built names change whenever the content does, so browsers never revalidate
+MAX_AGE = 365 * 24 * 3600
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".otf", ".ttf"}
+# Below this a compressed variant saves less than its headers cost
+MIN_COMPRESS_SIZE = 512
+
+# Latin, Latin-1 and common punctuation and symbols
+FONT_SUBSET = (
+    "U+0000-00FF,U+0131,U+0152-0153,U+02BB-02BC,U+02C6,U+02DA,U+02DC,"
+    "U+2000-206F,U+2074,U+20AC,U+2122,U+2191,U+2193,U+2212,U+2215,U+FEFF,U+FFFD"
+)
+FONT_SOURCES = (".otf", ".OTF", ".ttf", ".TTF")
+
+_TEMPLATE_REF = re.compile(r"""asset_url\(\s*["']([^"']+)["']\s*\)""")
+_CSS_URL = re.compile(
+    r"""url\(\s*(["']?)([^"')]+)\1\s*\)(\s*format\(\s*["']([\w-]+)["']\s*\))?"""
+)
+_FONT_FORMATS = ("opentype", "truetype")
+
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/otf", ".otf")
+
+
+# ---------------------------
+# Runtime
+# ---------------------------
+def load_manifest(path=MANIFEST_PATH):
+    if DISABLED:
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# Read once per process, like the prompt registry
+MANIFEST = load_manifest()
+
+
+def asset_url(path):
+    """URL for a file under static/, e.g. ``asset_url("chatbot.js")``."""
+    built = MANIFEST.get(path)
+    if built is None:
+        return f"/static/{path}"
+    return URL_PREFIX + built
+
+
+def pick_variant(path, accept_encodings):
+    """``(file, content_encoding)`` to send for the built file at ``path``.
+
+    ``accept_encodings`` maps an encoding to the client's quality for it
+    (werkzeug's ``request.accept_encodings``).
+    """
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accept_encodings[encoding] > 0 and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+# ---------------------------
+# Build
+# ---------------------------
+def fingerprint(path, data):
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def template_assets(templates_dir=TEMPLATES_DIR):
+    found = []
+    for name in sorted(os.listdir(templates_dir)):
+        with open(os.path.join(templates_dir, name)) as f:
+            found.extend(_TEMPLATE_REF.findall(f.read()))
+    return list(dict.fromkeys(found))
+
+
+class Builder:
+    def __init__(self, dist_dir=DIST_DIR, fonts=True):
+        self.dist_dir = dist_dir
+        self.fonts = fonts
+        self.manifest = {}
+        # (source path, built path, raw bytes, gzip bytes, brotli bytes)
+        self.report = []
+
+    def add(self, path):
+        """Build ``path`` (relative to static/) and what it references; returns the built name."""
+        if path in self.manifest:
+            return self.manifest[path]
+        source = os.path.join(STATIC_DIR, *path.split("/"))
+        ext = posixpath.splitext(path)[1].lower()
+        if ext == ".woff2" and not os.path.exists(source):
+            data = self.woff2(path)
+        elif os.path.isfile(source):
+            with open(source, "rb") as f:
+                data = f.read()
+        else:
+            data = None
+        if data is None:
+            if ext != ".woff2":
+                print(f"Skipping {path}: not found")
+            return None
+        if ext == ".css":
+            data = self.rewrite_css(path, data)
+
+        built = fingerprint(path, data)
+        self.write(path, built, data)
+        self.manifest[path] = built
+        return built
+
+    def rewrite_css(self, path, data):
+        base = posixpath.dirname(path)
+
+        def replace(match):
+            quote, ref, font_format, format_name = match.groups()
+            if ref.startswith(("data:", "http:", "https:", "//", "#")):
+                return match.group(0)
+            if ref.startswith("/static/"):
+                target = ref[len("/static/"):]
+            else:
+                target = posixpath.normpath(posixpath.join(base, ref))
+            if self.fonts and format_name in _FONT_FORMATS:
+                built = self.add(posixpath.splitext(target)[0] + ".woff2")
+                if built is not None:
+                    font_format = ' format("woff2")'
+                    target = None
+            if target is not None:
+                built = self.add(target)
+                if built is None:
+                    return match.group(0)
+            # Built files keep their directory, so the relative path still works
+            url = posixpath.relpath(built, base or ".")
+            return f"url({quote}{url}{quote}){font_format or ''}"
+
+        return _CSS_URL.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+    def woff2(self, path):
+        if not self.fonts:
+            return None
+        stem = os.path.splitext(os.path.join(STATIC_DIR, *path.split("/")))[0]
+        source = next((stem + ext for ext in FONT_SOURCES if os.path.isfile(stem + ext)), None)
+        if source is None:
+            print(f"Skipping {path}: no .otf/.ttf source")
+            return None
+        try:
+            from fontTools import subset
+        except ImportError:
+            print(f"Skipping {path}: fonttools is not installed")
+            return None
+
+        options = subset.Options()
+        options.flavor = "woff2"
+        font = subset.load_font(source, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=subset.parse_unicodes(FONT_SUBSET))
+        subsetter.subset(font)
+        buffer = io.BytesIO()
+        try:
+            subset.save_font(font, buffer, options)
+        except ImportError:
+            # WOFF2 output needs the brotli package
+            print(f"Skipping {path}: brotli is not installed")
+            return None
+        return buffer.getvalue()
+
+    def write(self, path, built, data):
+        target = os.path.join(self.dist_dir, *built.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+
+        sizes = {"gz": None, "br": None}
+        ext = posixpath.splitext(path)[1].lower()
+        if ext in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+            variants = {"gz": gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(data, quality=11)
+            for suffix, compressed in variants.items():
+                if len(compressed) < len(data):
+                    with open(f"{target}.{suffix}", "wb") as f:
+                        f.write(compressed)
+                    sizes[suffix] = len(compressed)
+        self.report.append((path, built, len(data), sizes["gz"], sizes["br"]))
+
+
+def build(dist_dir=DIST_DIR, fonts=True):
+    builder = Builder(dist_dir, fonts)
+    for path in template_assets():
+        builder.add(path)
+
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(builder.manifest, f, indent=2, sort_keys=True)
+    # Built files have unique names, so only the manifest needs swapping
+    os.replace(tmp_path, manifest_path)
+    return builder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_command = commands.add_parser("build", help=f"write assets and a manifest to {DIST_DIR}")
+    build_command.add_argument("--dist", default=DIST_DIR)
+    build_command.add_argument("--no-fonts", action="store_true", help="skip the WOFF2 conversion")
+    args = parser.parse_args()
+
+    builder = build(args.dist, fonts=not args.no_fonts)
+    width = max((len(built) for _, built, *_ in builder.report), default=5)
+    print(f"{'asset':<{width}} {'raw':>9} {'gzip':>9} {'brotli':>9}")
+    for path, built, raw, gz, br in builder.report:
+        print(f"{built:<{width}} {raw:>9} {gz or '-':>9} {br or '-':>9}")
+    print(f"Wrote {len(builder.manifest)} assets to {args.dist}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Local stand-ins for the OpenAI and SerpAPI HTTP APIs.
+
+Serves just enough of each API for the app's own calls:
+
+    POST /v1/responses          (chatbot tool calls, comparison/research JSON; stream=true supported)
+    POST /v1/chat/completions   (shopping-list items)
+    GET  /search.json           (SerpAPI images and shopping results)
+
+Every request waits ``latency`` +/- ``jitter`` seconds and fails with a 500
+at ``error_rate``. Point the app at it with
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 SERPAPI_URL=http://127.0.0.1:8765/search.json
+
+Run standalone with ``python -m benchmarks.fake_upstreams --latency 0.8``.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Scripted chatbot flow, picked by how many user turns the request carries
+CHAT_SCRIPT = [
+    ("createMultipleChoice", {
+        "question": "What will you mainly use it for?",
+        "reason": "Use case decides the product category.",
+        "options": ["School", "Gaming", "Work", "Travel"],
+    }),
+    ("addUserRequirement", {"requirement": "Used mainly for school"}),
+    ("createSliderQuestion", {
+        "question": "What is your budget?",
+        "reason": "Budget narrows the options.",
+        "min": 200,
+        "max": 2000,
+    }),
+    ("addUserConstraint", {"constraint": "Budget under $900"}),
+    ("recommendations", {"recommendations": [
+        {"text": f"Fake Laptop {n}", "specs": "16GB RAM, 512GB SSD", "price": "$799", "ratings": "4.5"}
+        for n in range(1, 5)
+    ]}),
+]
+
+RESEARCH_RESULT = {
+    "price": "$799 on Example Store",
+    "specs": [{"name": "RAM", "value": "16GB"}, {"name": "Storage", "value": "512GB SSD"}],
+    "pros": "Fast, Light",
+    "cons": "Average battery",
+}
+
+
+class FakeUpstreams:
+    def __init__(self, host="127.0.0.1", port=8765, latency=0.5, jitter=0.1, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.counter = itertools.count(1)
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # ---------------------------
+    # Canned payloads
+    # ---------------------------
+    def chat_turn(self, body):
+        user_turns = sum(1 for m in body.get("input", []) if m.get("role") == "user")
+        name, args = CHAT_SCRIPT[(user_turns - 1) % len(CHAT_SCRIPT)]
+        return {
+            "type": "function_call",
+            "id": f"fc_{next(self.counter)}",
+            "call_id": f"call_{next(self.counter)}",
+            "name": name,
+            "arguments": json.dumps(args),
+            "status": "completed",
+        }
+
+    def text_turn(self, body):
+        messages = body.get("input", [])
+        system = messages[0].get("content", "") if messages else ""
+        if "product research assistant" in system:
+            user = messages[-1].get("content", "")
+            payload = {"item": user.rsplit(":", 1)[-1].strip() or "Item", **RESEARCH_RESULT}
+        else:
+            payload = {
+                "table": [{"item": "Fake Item", "price": "$1", "specs": [], "pros": "", "cons": ""}],
+                "distinctions": "None.",
+                "recommend": "Overall Best: Fake Item | Best Affordable Option: Fake Item",
+            }
+        return {
+            "type": "message",
+            "id": f"msg_{next(self.counter)}",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": json.dumps(payload), "annotations": []}],
+        }
+
+    def response_object(self, body, item):
+        return {
+            "id": f"resp_{next(self.counter)}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "status": "completed",
+            "output": [item],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": len(json.dumps(body)) // 4,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": len(json.dumps(item)) // 4,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": (len(json.dumps(body)) + len(json.dumps(item))) // 4,
+            },
+        }
+
+    def chat_completion(self, body):
+        n = next(self.counter)
+        schema_name = (body.get("response_format") or {}).get("json_schema", {}).get("name")
+        if schema_name == "review_summaries":
+            # One summary per "### <id>: <name>" section of the prompt
+            ids = re.findall(r"^### (\d+):", body["messages"][-1]["content"], re.M)
+            content = json.dumps({"summaries": [
+                {"id": int(i), "summary": f"Scripted summary {n}-{i}"} for i in ids
+            ]})
+        else:
+            items = [{"item": f"Fake item {n}-{i}", "reason": "Scripted reason"} for i in range(3)]
+            # Structured outputs wrap the list: {"items": [...]}
+            content = json.dumps({"items": items} if schema_name else items)
+        return {
+            "id": f"chatcmpl-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(json.dumps(body)) // 4, "completion_tokens": 40, "total_tokens": 0},
+        }
+
+    def serp(self, query):
+        q = query.get("q", [""])[0]
+        if query.get("tbm", [""])[0] == "isch":
+            return {"images_results": [{"original": f"https://example.com/img/{abs(hash(q))}.jpg"}]}
+        return {"shopping_results": [
+            {"title": f"{q} {i}", "snippet": f"Review {i} of {q}: solid value, decent build."}
+            for i in range(5)
+        ]}
+
+    # ---------------------------
+    # HTTP handler
+    # ---------------------------
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _delay_or_fail(self):
+                upstream.requests += 1
+                delay = upstream.latency + random.uniform(-upstream.jitter, upstream.jitter)
+                time.sleep(max(0.0, delay))
+                if random.random() < upstream.error_rate:
+                    self._json(500, {"error": {"message": "fake upstream error", "type": "server_error"}})
+                    return True
+                return False
+
+            def _json(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body, item):
+                response = upstream.response_object(body, item)
+                events = [
+                    ("response.created", {"response": {**response, "status": "in_progress", "output": []}}),
+                    ("response.output_item.added", {"output_index": 0, "item": item}),
+                ]
+                if item["type"] == "message":
+                    text = item["content"][0]["text"]
+                    for start in range(0, len(text), 16):
+                        events.append(("response.output_text.delta", {
+                            "item_id": item["id"], "output_index": 0, "content_index": 0,
+                            "delta": text[start:start + 16], "logprobs": [],
+                        }))
+                events.append(("response.output_item.done", {"output_index": 0, "item": item}))
+                events.append(("response.completed", {"response": response}))
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for seq, (kind, data) in enumerate(events):
+                    data = {"type": kind, "sequence_number": seq, **data}
+                    self.wfile.write(f"event: {kind}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.close_connection = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self._delay_or_fail():
+                    return
+                path = urlparse(self.path).path
+                if path.endswith("/responses"):
+                    tools = body.get("tools") or []
+                    if any(tool.get("type") == "function" for tool in tools):
+                        item = upstream.chat_turn(body)
+                    else:
+                        item = upstream.text_turn(body)
+                    if body.get("stream"):
+                        self._stream(body, item)
+                    else:
+                        self._json(200, upstream.response_object(body, item))
+                elif path.endswith("/chat/completions"):
+                    self._json(200, upstream.chat_completion(body))
+                else:
+                    self._json(404, {"error": {"message": f"Unknown path {path}"}})
+
+            def do_GET(self):
+                if self._delay_or_fail():
+                    return
+                parsed = urlparse(self.path)
+                if parsed.path.endswith("/search.json"):
+                    self._json(200, upstream.serp(parse_qs(parsed.query)))
+                else:
+                    self._json(404, {"error": f"Unknown path {parsed.path}"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake OpenAI + SerpAPI server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per upstream call")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Fake upstreams on {upstreams.url} (OPENAI_BASE_URL={upstreams.url}/v1)")
+    upstreams.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Concurrent load test against a running server.
+
+Start the app in each mode, then point this at it:
+
+    gunicorn -w 4 main:app --bind 0.0.0.0:5000          # sync
+    uvicorn asgi:app --host 0.0.0.0 --port 5001          # async
+
+    python -m benchmarks.load_test --url http://localhost:5000 --label sync
+    python -m benchmarks.load_test --url http://localhost:5001 --label async
+
+By default this posts to /get_shopping_list_item with a fresh event per
+request, so every request goes to the upstream model.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(label, latencies, errors, elapsed):
+    done = len(latencies)
+    return {
+        "label": label,
+        "requests": done + errors,
+        "errors": errors,
+        "throughput_rps": done / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_summary(result):
+    print(
+        f"{result['label']:<32} {result['requests']:>6} req "
+        f"{result['errors']:>4} err {result['throughput_rps']:>8.1f} req/s "
+        f"p50 {result['p50_ms']:>8.1f}ms p95 {result['p95_ms']:>8.1f}ms "
+        f"p99 {result['p99_ms']:>8.1f}ms"
+    )
+
+
+async def run_load(url, make_request, total, concurrency, label="", timeout=120):
+    """Fire ``total`` requests, ``concurrency`` at a time.
+
+    Each of the ``concurrency`` workers acts as one browser: it has its own
+    client (and cookie jar) and a ``state`` dict that persists between its
+    requests. ``make_request(client, index, state)`` performs one request and
+    returns the ``httpx.Response``.
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        state = {}
+        async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+            while next_index < total:
+                index = next_index
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    response = await make_request(client, index, state)
+                    if response.status_code >= 500:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return summarize(label or url, latencies, errors, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test against a running server.")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--path", default="/get_shopping_list_item")
+    parser.add_argument("--body", default=None, help="JSON body; {i} is replaced by the request index")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--label", default="")
+    args = parser.parse_args()
+
+    body = args.body or '{"event": "load test event {i}", "accepted": [], "rejected": []}'
+
+    async def make_request(client, index, state):
+        payload = json.loads(body.replace("{i}", str(index)))
+        return await client.post(args.path, json=payload)
+
+    result = asyncio.run(
+        run_load(args.url, make_request, args.requests, args.concurrency, args.label)
+    )
+    print_summary(result)
+
+
+if __name__ == "__main__":
+    main()
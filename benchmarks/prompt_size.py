@@ -0,0 +1,72 @@
+"""Prompt size per chatbot turn, with and without history compaction.
+
+Run from the project root:
+
+    python -m benchmarks.prompt_size --turns 20
+"""
+
+import argparse
+import json
+from history_compaction import compact_history, count_message_tokens
+from prompt_registry import get_prompt
+
+
+def user_message(requirements, constraints, answer):
+    # Mirrors the context block static/chatbot.js prepends to every answer
+    context = ""
+    if requirements:
+        context += "Current Requirements:\n- " + "\n- ".join(requirements) + "\n\n"
+    if constraints:
+        context += "Current Constraints:\n- " + "\n- ".join(constraints) + "\n\n"
+    return context + "User message: " + answer
+
+
+def simulated_turns(turns):
+    # Alternates questions and logged requirements/constraints the way a
+    # real laptop-shopping chat does
+    requirements, constraints = [], []
+    for turn in range(turns):
+        answer = f"Option {turn % 4 + 1}" if turn else "I need a laptop for college"
+        user = user_message(requirements, constraints, answer)
+        match turn % 3:
+            case 0:
+                reply = {
+                    "type": "question_multiple_choice",
+                    "question": f"Question {turn}: which matters most for your use case?",
+                    "reasoning": "Knowing this narrows the product category considerably.",
+                    "options": ["Battery life", "Performance", "Portability", "Price"],
+                }
+            case 1:
+                requirements.append(f"Requirement from turn {turn}")
+                reply = {"type": "user_requirement", "requirement": requirements[-1]}
+            case _:
+                constraints.append(f"Constraint from turn {turn}")
+                reply = {"type": "user_constraint", "constraint": constraints[-1]}
+        yield user, json.dumps(reply)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=None)
+    args = parser.parse_args()
+
+    system = [{"role": "system", "content": get_prompt("chatbot")}]
+    history = []
+
+    print(f"{'turn':>4} {'full':>8} {'compacted':>10} {'saved':>7}")
+    for turn, (user, reply) in enumerate(simulated_turns(args.turns), start=1):
+        msg = [{"role": "user", "content": user}]
+        full = count_message_tokens(system + history + msg)
+        compacted = count_message_tokens(
+            system + compact_history(history, budget=args.budget) + msg
+        )
+        saved = 1 - compacted / full
+        print(f"{turn:>4} {full:>8} {compacted:>10} {saved:>6.0%}")
+
+        history.append({"role": "user", "content": user})
+        history.append({"role": "assistant", "content": reply})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Per-request prompt/tool setup cost, before and after the prompt registry.
+
+Run from the project root:
+
+    python -m benchmarks.registry_overhead
+"""
+
+import json
+import os
+import timeit
+from prompt_registry import PROMPTS_DIR, get_prompt, get_schema
+
+TOOLS_PATH = os.path.join(PROMPTS_DIR, "chatbot_tools.json")
+COMPARE_PATH = os.path.join(PROMPTS_DIR, "compare2.txt")
+
+with open(TOOLS_PATH, "r", encoding="utf-8") as f:
+    TOOLS_SOURCE = f.read()
+
+
+def before():
+    # What every request used to do: rebuild the tool list and reread
+    # compare2.txt from disk
+    tools = json.loads(TOOLS_SOURCE)
+    with open(COMPARE_PATH, "r", encoding="utf-8") as f:
+        compare_prompt = f.read()
+    return tools, compare_prompt
+
+
+def after():
+    return get_schema("chatbot_tools"), get_prompt("compare2")
+
+
+def main():
+    number = 20000
+    for name, fn in (("before", before), ("after", after)):
+        seconds = min(timeit.repeat(fn, number=number, repeat=5))
+        print(f"{name:>6}: {seconds / number * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Offline load-test suite: every scenario against every server mode.
+
+Starts the fake OpenAI/SerpAPI upstreams, boots the app in each serving mode
+pointed at them, runs the scripted scenarios and reports p50/p95/p99 latency
+and throughput per endpoint and mode. No network access or API keys needed.
+
+    python -m benchmarks.run_suite
+    python -m benchmarks.run_suite --modes gunicorn async --latency 0.8 --json results.json
+    python -m benchmarks.run_suite --baseline results.json   # exit 1 on p95 regressions
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks.fake_upstreams import FakeUpstreams
+from benchmarks.load_test import print_summary, run_load
+from benchmarks.scenarios import SCENARIOS
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "gunicorn": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app", "--bind", "127.0.0.1:{port}"],
+    "waitress": [sys.executable, "-m", "waitress", "--listen=127.0.0.1:{port}", "main:app"],
+    "flask-dev": [sys.executable, "-m", "flask", "--app", "main", "run", "--port", "{port}"],
+    "async": [sys.executable, "-m", "uvicorn", "asgi:app", "--port", "{port}", "--log-level", "warning"],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(upstream_url, cache_dir, warm_caches):
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": f"{upstream_url}/v1",
+        "SERPAPI_KEY": "fake-key",
+        "SERPAPI_URL": f"{upstream_url}/search.json",
+        "FLASK_SECRET_KEY": "benchmark",
+        "CNZ_CACHE_DIR": cache_dir,
+        "PYTHONUNBUFFERED": "1",
+    })
+    if not warm_caches:
+        # Measure the upstream path, not the caches
+        env.update({
+            "LLM_CACHE_DISABLED": "1",
+            "SERP_IMAGE_CACHE_TTL": "0",
+            "SERP_IMAGE_NEGATIVE_TTL": "0",
+            "EVENT_CATALOG_DISABLED": "1",
+        })
+    return env
+
+
+def wait_until_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} not ready after {timeout}s")
+
+
+def run_mode(mode, args, upstream_url):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    command = [part.format(port=port) for part in MODES[mode]]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        process = subprocess.Popen(
+            command,
+            cwd=PROJECT_ROOT,
+            env=server_env(upstream_url, cache_dir, args.warm_caches),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL if not args.verbose else None,
+        )
+        try:
+            wait_until_ready(url, process)
+            results = []
+            for name in args.scenarios:
+                result = asyncio.run(
+                    run_load(url, SCENARIOS[name], args.requests, args.concurrency, f"{mode} {name}")
+                )
+                result.update({"mode": mode, "endpoint": name})
+                print_summary(result)
+                results.append(result)
+            return results
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def find_regressions(results, baseline, tolerance):
+    previous = {(r["mode"], r["endpoint"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["mode"], result["endpoint"]))
+        if before and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append((result["label"], before["p95_ms"], result["p95_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load-test suite with fake upstreams.")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake upstream latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--warm-caches", action="store_true", help="leave the response caches on")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare p95 against results from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 increase (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="show server stderr")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        port=0, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate
+    ).start()
+    print(f"Fake upstreams on {upstreams.url}, latency {args.latency}s +/- {args.jitter}s")
+
+    results = []
+    try:
+        for mode in args.modes:
+            results.extend(run_mode(mode, args, upstreams.url))
+    finally:
+        upstreams.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for label, before, after in regressions:
+            print(f"REGRESSION {label}: p95 {before:.1f}ms -> {after:.1f}ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Scripted load scenarios, one per endpoint.
+
+Each scenario is a ``make_request(client, index, state)`` coroutine for
+``benchmarks.load_test.run_load``; ``state`` persists per simulated user.
+"""
+
+# Turns per simulated chat before the user starts a new conversation
+CHAT_TURNS = 5
+# "+ Generate another..." clicks per simulated shopping list
+SHOPPING_CLICKS = 8
+
+EVENTS = ["back to school", "camping trip", "moving", "new baby", "beach vacation"]
+POPULAR_PRODUCTS = [
+    "Apple AirPods Pro", "Sony WH-1000XM5", "Kindle Paperwhite", "Nintendo Switch",
+    "Instant Pot Duo", "Dyson V8", "MacBook Air M3", "iPad 10th generation",
+    "Logitech MX Master 3S", "Yeti Rambler", "Ninja Air Fryer", "Fitbit Charge 6",
+]
+
+
+async def chat(client, index, state):
+    turn = state.get("turn", 0)
+    state["turn"] = turn + 1
+    if turn % CHAT_TURNS == 0:
+        # New browser session: new cookie, empty history
+        client.cookies.clear()
+        user_input = "I need a laptop for college"
+    else:
+        user_input = "Current Requirements:\n- Used mainly for school\n\nUser message: School"
+    return await client.post("/get_response", json={"user_input": user_input})
+
+
+async def compare(client, index, state):
+    # Bare names, as compare.js sends them: research + compile upstream calls
+    items = [f"Laptop {index} A", f"Laptop {index} B"]
+    return await client.post("/compare-items", json={"items": items})
+
+
+async def shopping_list(client, index, state):
+    clicks = state.get("clicks", 0)
+    state["clicks"] = clicks + 1
+    if clicks % SHOPPING_CLICKS == 0:
+        state["event"] = f"{EVENTS[index % len(EVENTS)]} {index}"
+        state["accepted"] = []
+    response = await client.post(
+        "/get_shopping_list_item",
+        json={"event": state["event"], "accepted": state["accepted"], "rejected": []},
+    )
+    item = response.json().get("item") if response.status_code == 200 else None
+    if item:
+        state["accepted"].append(item)
+    return response
+
+
+async def image(client, index, state):
+    name = POPULAR_PRODUCTS[index % len(POPULAR_PRODUCTS)]
+    return await client.get("/get_image_serp", params={"item_name": name})
+
+
+SCENARIOS = {
+    "get_response": chat,
+    "compare-items": compare,
+    "get_shopping_list_item": shopping_list,
+    "get_image_serp": image,
+}
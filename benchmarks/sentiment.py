@@ -0,0 +1,78 @@
+"""Review-snippet sentiment: per-string TextBlob vs analyze_sentiment_batch.
+
+Scores a synthetic set of review snippets (with the repeats real SerpAPI
+results have), checks the batch scores against TextBlob and reports the
+time per snippet for each path. Run from the project root:
+
+    python -m benchmarks.sentiment
+    python -m benchmarks.sentiment --snippets 5000 --unique 0.5
+"""
+
+import argparse
+import random
+import time
+from apis.sentiment import _memo, analyze_sentiment, analyze_sentiment_batch
+
+TEMPLATES = [
+    "The {part} is {adj}, but the {part2} is {adj2}.",
+    "{adv} {adj} {product}! Would buy again.",
+    "Not {adj} at all, the {part} broke after {n} weeks.",
+    "I don't think the {part} is {adj}... {adv} {adj2} overall :)",
+    "{adj} value for the money, {adv} recommended.",
+    "Worst {product} ever!! The {part} is {adj2}.",
+]
+WORDS = {
+    "part": ["battery", "screen", "case", "strap", "sound", "fit", "charger"],
+    "part2": ["price", "build", "app", "shipping", "packaging"],
+    "adj": ["good", "great", "bad", "terrible", "decent", "amazing", "cheap", "slow"],
+    "adj2": ["fine", "awful", "excellent", "poor", "okay", "disappointing"],
+    "adv": ["very", "really", "extremely", "quite", "highly", "not"],
+    "product": ["earbuds", "laptop", "blender", "backpack", "tent"],
+}
+
+
+def make_snippets(count, unique_share, seed=7):
+    rng = random.Random(seed)
+    pool_size = max(1, int(count * unique_share))
+    pool = []
+    for _ in range(pool_size):
+        template = rng.choice(TEMPLATES)
+        fields = {name: rng.choice(options) for name, options in WORDS.items()}
+        pool.append(template.format(n=rng.randint(1, 9), **fields))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snippets", type=int, default=2000)
+    parser.add_argument("--unique", type=float, default=0.3, help="share of distinct snippets")
+    args = parser.parse_args()
+
+    snippets = make_snippets(args.snippets, args.unique)
+    # Both paths load their lexicon before the clock starts
+    analyze_sentiment("warm up")
+    analyze_sentiment_batch(["warm up"])
+    _memo.clear()
+
+    expected, per_string = timed(lambda: [analyze_sentiment(s) for s in snippets])
+    cold, batch_cold = timed(lambda: analyze_sentiment_batch(snippets))
+    _, batch_warm = timed(lambda: analyze_sentiment_batch(snippets))
+
+    worst = max(abs(a - b) for a, b in zip(expected, cold))
+    print(f"{len(snippets)} snippets, {len(set(snippets))} distinct; max |diff| vs TextBlob {worst:.2e}")
+    for label, seconds in (
+        ("TextBlob per string", per_string),
+        ("batch, cold memo", batch_cold),
+        ("batch, warm memo", batch_warm),
+    ):
+        print(f"{label:>20}: {seconds / len(snippets) * 1e6:8.1f} us/snippet")
+
+
+if __name__ == "__main__":
+    main()
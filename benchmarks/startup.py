@@ -0,0 +1,158 @@
+"""Cold start and per-worker memory of the web app.
+
+Times ``import main`` in fresh interpreters (and lists which heavy SDKs the
+import pulled in), then boots gunicorn with and without ``preload_app``
+against the fake upstreams, sends each worker some traffic and reads the
+workers' proportional (PSS) and private memory from /proc. Linux only for
+the memory part. Run from the project root:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --workers 4 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.fake_upstreams import FakeUpstreams
+from benchmarks.load_test import run_load
+from benchmarks.run_suite import PROJECT_ROOT, free_port, server_env, wait_until_ready
+from benchmarks.scenarios import SCENARIOS
+
+HEAVY_MODULES = ("openai", "textblob", "numpy", "httpx")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+rss_kb = 0
+with open("/proc/self/status") as status:
+    for line in status:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+print(json.dumps({
+    "seconds": seconds,
+    "rss_kb": rss_kb,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def time_import(env, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE],
+            cwd=PROJECT_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return samples
+
+
+def smaps_rollup(pid):
+    """Pss and private (clean + dirty) memory of one process, in KiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "pss_kb": fields.get("Pss", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def measure_gunicorn(preload, args, upstream_url):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    command = [
+        sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers),
+    ]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = server_env(upstream_url, cache_dir, warm_caches=False)
+        env["GUNICORN_PRELOAD"] = "1" if preload else "0"
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            command,
+            cwd=PROJECT_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(url, process)
+            ready = time.perf_counter() - start
+            # Warm every worker: first model calls import the SDK lazily
+            for name in ("get_response", "get_shopping_list_item"):
+                asyncio.run(
+                    run_load(url, SCENARIOS[name], args.requests, args.workers * 4, name)
+                )
+            pids = worker_pids(process.pid)
+            workers = [smaps_rollup(pid) for pid in pids]
+            master = smaps_rollup(process.pid)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return {
+        "preload": preload,
+        "ready_seconds": ready,
+        "workers": len(workers),
+        "worker_pss_kb": statistics.mean(w["pss_kb"] for w in workers),
+        "worker_private_kb": statistics.mean(w["private_kb"] for w in workers),
+        "total_pss_kb": master["pss_kb"] + sum(w["pss_kb"] for w in workers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters for the import timing")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="warm-up requests per scenario")
+    parser.add_argument("--skip-gunicorn", action="store_true")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(port=0, latency=0.01, jitter=0.0).start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            samples = time_import(server_env(upstreams.url, cache_dir, warm_caches=False), args.runs)
+        seconds = statistics.median(s["seconds"] for s in samples)
+        rss = statistics.median(s["rss_kb"] for s in samples)
+        print(f"import main: {seconds * 1000:.0f} ms median of {args.runs}, RSS {rss / 1024:.1f} MiB")
+        print(f"  heavy modules loaded at import: {', '.join(samples[0]['loaded']) or 'none'}")
+
+        if args.skip_gunicorn:
+            return
+        print(f"\ngunicorn, {args.workers} workers, after {args.requests} chat + shopping requests:")
+        print(f"{'preload':>8} {'ready s':>8} {'PSS/worker':>11} {'private/worker':>15} {'total PSS':>10}")
+        for preload in (False, True):
+            r = measure_gunicorn(preload, args, upstreams.url)
+            print(
+                f"{'on' if preload else 'off':>8} {r['ready_seconds']:8.2f}"
+                f" {r['worker_pss_kb'] / 1024:9.1f}Mi {r['worker_private_kb'] / 1024:13.1f}Mi"
+                f" {r['total_pss_kb'] / 1024:8.1f}Mi"
+            )
+    finally:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
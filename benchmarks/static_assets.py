@@ -0,0 +1,99 @@
+"""Bytes and worker time for static files, /static vs the built assets.
+
+Loads each page through the Flask test client, follows its stylesheets,
+scripts and the fonts the stylesheets pull in, and reports per page:
+
+- first visit: bytes sent and server time, with ``Accept-Encoding: br, gzip``
+- repeat visit: requests still reaching a worker. /static responses are
+  revalidated (a 304 per file); built assets are immutable, so none are.
+
+Run ``python assets.py build`` first, then from the project root:
+
+    python -m benchmarks.static_assets
+"""
+
+import argparse
+import re
+import time
+from urllib.parse import urljoin
+import assets
+from main import app
+
+PAGES = ("/", "/compare", "/shopping-list")
+_PAGE_REF = re.compile(r"""(?:href|src)="(/(?:static|assets)/[^"]+)\"""")
+_CSS_REF = re.compile(r"""url\(\s*["']?([^"')]+)["']?\s*\)""")
+
+
+def crawl(client, urls):
+    """Every same-site URL a page needs, with the response for each."""
+    responses = {}
+    pending = list(urls)
+    while pending:
+        url = pending.pop()
+        if url in responses:
+            continue
+        start = time.perf_counter()
+        response = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+        elapsed = time.perf_counter() - start
+        responses[url] = (response, elapsed)
+        if response.mimetype == "text/css":
+            css = client.get(url, headers={"Accept-Encoding": "identity"}).get_data(as_text=True)
+            pending.extend(
+                urljoin(url, ref) for ref in _CSS_REF.findall(css) if not ref.startswith(("data:", "http"))
+            )
+    return responses
+
+
+def revalidate(client, responses):
+    """Requests a returning browser still sends, and their server time."""
+    count, seconds = 0, 0.0
+    for url, (response, _) in responses.items():
+        if "immutable" in response.headers.get("Cache-Control", ""):
+            continue
+        headers = {"Accept-Encoding": "br, gzip"}
+        if response.headers.get("ETag"):
+            headers["If-None-Match"] = response.headers["ETag"]
+        start = time.perf_counter()
+        client.get(url, headers=headers)
+        seconds += time.perf_counter() - start
+        count += 1
+    return count, seconds
+
+
+def page_urls(client, page, built):
+    urls = _PAGE_REF.findall(client.get(page).get_data(as_text=True))
+    if built:
+        return urls
+    # The same files as plain /static URLs
+    sources = {assets.URL_PREFIX + b: f"/static/{path}" for path, b in assets.MANIFEST.items()}
+    return [sources.get(url, url) for url in urls]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20, help="page loads per measurement")
+    args = parser.parse_args()
+    if not assets.MANIFEST:
+        raise SystemExit("No asset manifest; run `python assets.py build` first")
+
+    client = app.test_client()
+    print(f"{'page':<15} {'mode':<7} {'files':>5} {'first KiB':>10} {'first ms':>9} {'repeat reqs':>12} {'repeat ms':>10}")
+    for page in PAGES:
+        for built in (False, True):
+            urls = page_urls(client, page, built)
+            first_ms = repeat_ms = 0.0
+            for _ in range(args.rounds):
+                responses = crawl(client, urls)
+                first_ms += sum(elapsed for _, elapsed in responses.values()) * 1000
+                requests, seconds = revalidate(client, responses)
+                repeat_ms += seconds * 1000
+            sent = sum(len(response.get_data()) for response, _ in responses.values())
+            print(
+                f"{page:<15} {'built' if built else 'static':<7} {len(responses):>5}"
+                f" {sent / 1024:>10.1f} {first_ms / args.rounds:>9.2f}"
+                f" {requests:>12} {repeat_ms / args.rounds:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
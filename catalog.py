@@ -0,0 +1,239 @@
+"""Precomputed shopping lists for the most common events.
+
+The catalog is built offline (one batch of model calls per event) and stored
+as JSON. At request time an event string is matched to a catalog entry by
+normalized or fuzzy lookup, and the next item the user has not seen yet is
+served without a model call.
+
+    python catalog.py build                 # (re)generate data/event_catalog.json
+    python catalog.py build --events "back to school" camping --count 40
+    python catalog.py hitrate events.txt    # share of event strings the catalog answers
+"""
+
+import argparse
+import difflib
+import json
+import os
+import re
+import threading
+import time
+from apis.cache import normalize_query
+from shopping_list import MODEL, PROMPT_VERSION, request_items
+
+CATALOG_PATH = os.getenv(
+    "EVENT_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "event_catalog.json"),
+)
+DISABLED = os.getenv("EVENT_CATALOG_DISABLED", "").lower() in ("1", "true", "yes")
+# difflib ratio an event string needs to count as a typo of a catalog event
+FUZZY_CUTOFF = float(os.getenv("EVENT_CATALOG_FUZZY_CUTOFF", 0.85))
+
+TOP_EVENTS = [
+    "back to school",
+    "college dorm",
+    "camping trip",
+    "moving",
+    "new apartment",
+    "new baby",
+    "baby shower",
+    "beach vacation",
+    "road trip",
+    "ski trip",
+    "hiking",
+    "wedding",
+    "birthday party",
+    "thanksgiving dinner",
+    "christmas",
+    "halloween",
+    "home office",
+    "hurricane preparedness",
+    "picnic",
+    "first apartment",
+]
+ITEMS_PER_EVENT = 40
+# Items asked for per model call while building
+BUILD_BATCH = 20
+
+_LEADING_WORDS = re.compile(r"^(?:(?:a|an|the|my|our|for|going|preparing for)\s+)+")
+
+
+def event_key(event):
+    # "Preparing for a Camping Trip!" -> "camping trip"
+    text = re.sub(r"[^\w\s]", " ", normalize_query(event))
+    return _LEADING_WORDS.sub("", " ".join(text.split()))
+
+
+class EventCatalog:
+    """Index over the catalog file: event string -> ranked item list."""
+
+    def __init__(self, path=CATALOG_PATH, fuzzy_cutoff=FUZZY_CUTOFF):
+        self.path = path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.events = {}
+        self._index = {}
+        self._ranked = {}
+        self._matches = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "exhausted": 0}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {"events": {}}
+        except (OSError, ValueError) as e:
+            print(f"Event catalog {self.path} unreadable, ignoring it: {e}")
+            data = {"events": {}}
+
+        self.events = data.get("events", {})
+        self._index = {}
+        self._ranked = {}
+        for name, entry in self.events.items():
+            for alias in [name, *entry.get("aliases", [])]:
+                self._index[event_key(alias)] = name
+            # Ranked items plus normalized item -> rank, so a lookup only
+            # touches the items the user has already seen
+            items, ranks = [], {}
+            for item in entry["items"]:
+                normalized = normalize_query(item["item"])
+                if normalized not in ranks:
+                    ranks[normalized] = len(items)
+                    items.append(item)
+            self._ranked[name] = (items, ranks)
+        self._matches = {}
+
+    def match(self, event):
+        """Return the catalog event name for ``event``, or None."""
+        key = event_key(event or "")
+        if not key:
+            return None
+        if key in self._index:
+            return self._index[key]
+        # Fuzzy answers are remembered, so each distinct string pays for difflib once
+        with self._lock:
+            if key in self._matches:
+                return self._matches[key]
+        close = difflib.get_close_matches(key, self._index, n=1, cutoff=self.fuzzy_cutoff)
+        name = self._index[close[0]] if close else None
+        with self._lock:
+            if len(self._matches) > 10000:
+                self._matches.clear()
+            self._matches[key] = name
+        return name
+
+    def next_item(self, event, accepted, rejected):
+        """Highest-ranked catalog item not yet accepted or rejected, or None."""
+        name = self.match(event)
+        if name is None:
+            self._count("misses")
+            return None
+        items, ranks = self._ranked[name]
+        taken = {ranks.get(normalize_query(item)) for item in [*accepted, *rejected]}
+        rank = 0
+        while rank in taken:
+            rank += 1
+        if rank < len(items):
+            self._count("hits")
+            return dict(items[rank])
+        self._count("exhausted")
+        return None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["exhausted"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["events"] = len(self.events)
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def load_catalog():
+    return None if DISABLED else EventCatalog()
+
+
+# ---------------------------
+# Offline build
+# ---------------------------
+def build_event(event, count=ITEMS_PER_EVENT):
+    """Ranked item list for one event, built from successive model batches."""
+    items = []
+    while len(items) < count:
+        batch = request_items(
+            event, [item["item"] for item in items], [], min(BUILD_BATCH, count - len(items))
+        )
+        if not batch:
+            break
+        items.extend(batch)
+    return items
+
+
+def build_catalog(events, count=ITEMS_PER_EVENT, path=CATALOG_PATH):
+    catalog = {
+        "model": MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "built": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "events": {},
+    }
+    for event in events:
+        items = build_event(event, count)
+        print(f"{event}: {len(items)} items")
+        if items:
+            catalog["events"][event] = {"aliases": [], "items": items}
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(catalog, f, indent=2)
+    # Readers never see a half-written catalog
+    os.replace(tmp_path, path)
+    return catalog
+
+
+def hit_rate(catalog, event_strings):
+    matched = {}
+    missed = {}
+    for event in event_strings:
+        bucket = matched if catalog.match(event) else missed
+        bucket[event] = bucket.get(event, 0) + 1
+    total = sum(matched.values()) + sum(missed.values())
+    return {
+        "total": total,
+        "hits": sum(matched.values()),
+        "hit_rate": sum(matched.values()) / total if total else 0.0,
+        "top_misses": sorted(missed.items(), key=lambda kv: -kv[1])[:20],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the event catalog.")
+    parser.add_argument("--path", default=CATALOG_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="generate the catalog with the model")
+    build.add_argument("--events", nargs="+", default=TOP_EVENTS)
+    build.add_argument("--count", type=int, default=ITEMS_PER_EVENT, help="items per event")
+
+    rate = commands.add_parser("hitrate", help="report how many event strings the catalog answers")
+    rate.add_argument("events_file", help="one event string per line, e.g. pulled from logs")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        catalog = build_catalog(args.events, args.count, args.path)
+        print(f"Wrote {len(catalog['events'])} events to {args.path}")
+    else:
+        with open(args.events_file) as f:
+            events = [line.strip() for line in f if line.strip()]
+        report = hit_rate(EventCatalog(args.path), events)
+        print(f"{report['hits']}/{report['total']} event strings matched ({report['hit_rate']:.1%})")
+        for event, count in report["top_misses"]:
+            print(f"  miss x{count}: {event}")
+
+
+if __name__ == "__main__":
+    main()
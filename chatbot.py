@@ -1,285 +1,344 @@
-import os
+import asyncio
 import json
-from openai import OpenAI
+import time
+from history_compaction import compact_history
+from prompt_registry import get_prompt, get_schema
+from apis.clients import async_openai_client, openai_client
+from apis import model_router
+from apis.metrics import usage_tokens
+from apis.resilience import guard
+from structured import IncrementalJSONParser, looks_like_json, parse_json
+from semantic_cache import SEMANTIC_CACHE
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Turns that call these are redone on the strong tier when a cheaper one answered
+ESCALATE_TOOLS = {"recommendations"}
 
-with open("prompts/chatbot.txt", "r", encoding="utf-8") as f:
-    SYSTEM_PROMPT = f.read()
 
-
-def ai_bot_response(msg, history):
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        *history,
+def build_messages(msg, history):
+    return [
+        {"role": "system", "content": get_prompt("chatbot")},
+        *compact_history(history),
         {"role": "user", "content": msg},
     ]
 
-    tools = [
-        {
-            "type": "function",
-            "name": "createMultipleChoice",
-            "description": "Create a multiple choice question for the user.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "question": {"type": "string"},
-                    "reason": {"type": "string"},
-                    "options": {"type": "array", "items": {"type": "string"}},
-                },
-                "required": ["question", "reason", "options"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "createSliderQuestion",
-            "description": "Create a question with a slider for a numerical range.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "question": {"type": "string"},
-                    "reason": {"type": "string"},
-                    "min": {"type": "integer"},
-                    "max": {"type": "integer"},
-                },
-                "required": ["question", "reason", "min", "max"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "createOpenEndedQuestion",
-            "description": "Create an open-ended question for the user.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "question": {"type": "string"},
-                    "reason": {"type": "string"},
-                },
-                "required": ["question", "reason"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "addUserRequirement",
-            "description": "Add a requirement to the user's requirements.",
-            "parameters": {
-                "type": "object",
-                "properties": {"requirement": {"type": "string"}},
-                "required": ["requirement"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "addUserConstraint",
-            "description": "Add a constraint to the user's constraints.",
-            "parameters": {
-                "type": "object",
-                "properties": {"constraint": {"type": "string"}},
-                "required": ["constraint"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "addSources",
-            "description": "Add sources/links with names and URLs for reference.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "sources": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "name": {"type": "string"},
-                                "url": {"type": "string"},
-                            },
-                            "required": ["name", "url"],
-                        },
-                    }
-                },
-                "required": ["sources"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "createUserReport",
-            "description": "Send message of summarized findings and evaluation (one paragraph)",
-            "parameters": {
-                "type": "object",
-                "properties": {"message": {"type": "string"}},
-                "required": ["message"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "recommendations",
-            "description": "Create a list of product recommendations.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "recommendations": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "text": {"type": "string"},
-                                "specs": {"type": "string"},
-                                "price": {"type": "string"},
-                                "ratings": {"type": "string"},
-                            },
-                            "required": ["text", "specs", "price", "ratings"],
-                        },
-                    }
-                },
-                "required": ["recommendations"],
-            },
-        },
-    ]
 
-    resp = client.responses.create(model="gpt-4o", input=messages, tools=tools)
+def build_tools():
+    # Built once at import by the prompt registry
+    return get_schema("chatbot_tools")
+
+
+def ai_bot_response(msg, history):
+    cached = cached_turn(msg, history)
+    if cached is not None:
+        return cached
+
+    messages = build_messages(msg, history)
+    tools = build_tools()
+
+    start = time.perf_counter()
+    route = model_router.route("chatbot")
+    resp = create_turn(route, messages, tools)
+    stronger = escalation(route, resp)
+    if stronger is not None:
+        resp = create_turn(stronger, messages, tools)
+    response = interpret_response(resp, msg)
+    remember_turn(msg, history, resp, response, time.perf_counter() - start)
+    return response
+
+
+def create_turn(route, messages, tools):
+    with guard("openai", route.call_site), route.timed():
+        resp = openai_client().responses.create(model=route.model, input=messages, tools=tools)
+    route.record_usage(resp)
+    return resp
+
+
+async def ai_bot_response_async(msg, history):
+    response, _, _ = await respond_async(msg, history)
+    return response
+
+
+async def respond_async(msg, history, call_site="chatbot", remember=True):
+    """``ai_bot_response_async`` plus the tokens the call used (0 when cached).
+
+    The third value is the latency to hand to ``remember_answer``, or None
+    when the turn is not one the semantic cache keeps. With
+    ``remember=False`` the turn is only stored once the caller does that.
+    """
+    # The semantic cache scores every stored turn: CPU work, kept off the loop
+    cached = await asyncio.to_thread(cached_turn, msg, history)
+    if cached is not None:
+        return cached, 0, None
+
+    messages = build_messages(msg, history)
+    tools = build_tools()
+
+    start = time.perf_counter()
+    route = model_router.route(call_site)
+    resp = await create_turn_async(route, messages, tools)
+    tokens = sum(usage_tokens(resp))
+    stronger = escalation(route, resp)
+    if stronger is not None:
+        resp = await create_turn_async(stronger, messages, tools)
+        tokens += sum(usage_tokens(resp))
+    response = interpret_response(resp, msg)
+    latency = time.perf_counter() - start
+    if remember:
+        await asyncio.to_thread(remember_turn, msg, history, resp, response, latency)
+    return response, tokens, latency if reusable(resp) else None
+
+
+async def create_turn_async(route, messages, tools):
+    with guard("openai", route.call_site), route.timed():
+        resp = await async_openai_client().responses.create(
+            model=route.model, input=messages, tools=tools
+        )
+    route.record_usage(resp)
+    return resp
+
+
+def escalation(route, resp):
+    """The stronger route to redo ``resp`` on, or None if it can stand."""
+    if any(
+        item.type == "function_call" and item.name in ESCALATE_TOOLS for item in resp.output
+    ):
+        return route.escalate()
+    return None
+
+
+def cached_turn(msg, history):
+    if SEMANTIC_CACHE is None:
+        return None
+    return SEMANTIC_CACHE.lookup(msg, history)
+
+
+def reusable(resp):
+    # Only tool-call answers are reused; text turns are too free-form
+    return any(item.type == "function_call" for item in resp.output)
+
 
+def remember_turn(msg, history, resp, response, latency):
+    if SEMANTIC_CACHE is not None and reusable(resp):
+        SEMANTIC_CACHE.store(msg, history, response, latency)
+
+
+def remember_answer(msg, history, response, latency):
+    """Store a turn computed with ``respond_async(remember=False)`` once it is used."""
+    if SEMANTIC_CACHE is not None and latency is not None:
+        SEMANTIC_CACHE.store(msg, history, response, latency)
+
+
+def interpret_response(resp, msg):
     for event in resp.output:
         if event.type == "function_call":
-            fn_name = event.name
-            args = json.loads(event.arguments)
-
-            match fn_name:
-                case "createMultipleChoice":
-                    return json.dumps(
-                        {
-                            "type": "question_multiple_choice",
-                            "question": args.get("question"),
-                            "reasoning": args.get("reason"),
-                            "options": args.get("options"),
-                        }
-                    )
-
-                case "createSliderQuestion":
-                    return json.dumps(
-                        {
-                            "type": "question_slider",
-                            "question": args.get("question"),
-                            "reasoning": args.get("reason"),
-                            "min": args.get("min"),
-                            "max": args.get("max"),
-                        }
-                    )
-
-                case "createOpenEndedQuestion":
-                    return json.dumps(
-                        {
-                            "type": "question_open_ended",
-                            "question": args.get("question"),
-                            "reasoning": args.get("reason"),
-                        }
-                    )
-
-                case "addUserRequirement":
-                    requirement = args.get("requirement")
-                    if "requirement added" in requirement.lower():
-                        return json.dumps({"type": "noop"})
-                    return json.dumps(
-                        {
-                            "type": "user_requirement",
-                            "requirement": requirement,
-                        }
-                    )
-
-                case "addUserConstraint":
-                    constraint = args.get("constraint")
-                    if "constraint added" in constraint.lower():
-                        return json.dumps({"type": "noop"})
-                    return json.dumps(
-                        {
-                            "type": "user_constraint",
-                            "constraint": constraint,
-                        }
-                    )
-
-                case "recommendations":
-                    recs = args.get("recommendations", [])
-                    return json.dumps(
-                        {
-                            "type": "recommendations_list",
-                            "recommendations": recs,
-                        }
-                    )
-
-                case "addSources":
-                    return json.dumps(
-                        {
-                            "type": "sources",
-                            "sources": args.get("sources", []),
-                        }
-                    )
-
-                case "createUserReport":
-                    return json.dumps(
-                        {
-                            "type": "user_report",
-                            "message": args.get("message"),
-                        }
-                    )
-
-    text = resp.output_text
-    if text and text.strip().startswith("{"):
+            response = format_function_call(event.name, json.loads(event.arguments))
+            if response is not None:
+                return response
+
+    return parse_text_response(resp.output_text, msg)
+
+
+def ai_bot_response_stream(msg, history):
+    """Stream a chatbot turn as ``(kind, payload)`` tuples.
+
+    Yields ``("delta", text)`` for partial output text, ``("tool", name)``
+    when the model starts a function call and finally a single
+    ``("response", json_str)`` with the same payload ``ai_bot_response``
+    would have returned.
+    """
+    cached = cached_turn(msg, history)
+    if cached is not None:
+        yield "response", cached
+        return
+
+    messages = build_messages(msg, history)
+    tools = build_tools()
+
+    start = time.perf_counter()
+    route = model_router.route("chatbot_stream")
+    # Times the wait for the stream to open (time to first byte)
+    with guard("openai", "chatbot_stream"), route.timed():
+        stream = openai_client().responses.create(
+            model=route.model, input=messages, tools=tools, stream=True
+        )
+
+    text_parts = []
+    parser = IncrementalJSONParser("chatbot_stream")
+    stronger = None
+    try:
+        for event in stream:
+            if stronger is not None and event.type != "response.completed":
+                # Escalating: only the usage of this answer is still wanted
+                continue
+
+            if event.type == "response.output_text.delta":
+                text_parts.append(event.delta)
+                yield "delta", event.delta
+                # Decoded as it arrives, so the end of the stream needs no re-parse
+                parser.feed(event.delta)
+
+            elif event.type == "response.output_item.added":
+                if event.item.type == "function_call":
+                    yield "tool", event.item.name
+
+            elif event.type == "response.completed":
+                route.record_usage(event.response)
+                if stronger is not None:
+                    break
+
+            elif event.type == "response.output_item.done":
+                item = event.item
+                if item.type != "function_call":
+                    continue
+                if item.name in ESCALATE_TOOLS:
+                    stronger = route.escalate()
+                    if stronger is not None:
+                        continue
+                response = format_function_call(item.name, json.loads(item.arguments))
+                if response is not None:
+                    # Same as the blocking path: the first tool call wins
+                    if SEMANTIC_CACHE is not None:
+                        SEMANTIC_CACHE.store(
+                            msg, history, response, time.perf_counter() - start
+                        )
+                    yield "response", response
+                    return
+    finally:
+        stream.close()
+
+    if stronger is not None:
+        # Tool turns are sent whole, so the redo needs no stream
+        resp = create_turn(stronger, messages, tools)
+        response = interpret_response(resp, msg)
+        remember_turn(msg, history, resp, response, time.perf_counter() - start)
+        yield "response", response
+        return
+
+    yield "response", parse_text_response("".join(text_parts), msg, parser.value)
+
+
+def format_function_call(fn_name, args):
+    match fn_name:
+        case "createMultipleChoice":
+            return json.dumps(
+                {
+                    "type": "question_multiple_choice",
+                    "question": args.get("question"),
+                    "reasoning": args.get("reason"),
+                    "options": args.get("options"),
+                }
+            )
+
+        case "createSliderQuestion":
+            return json.dumps(
+                {
+                    "type": "question_slider",
+                    "question": args.get("question"),
+                    "reasoning": args.get("reason"),
+                    "min": args.get("min"),
+                    "max": args.get("max"),
+                }
+            )
+
+        case "createOpenEndedQuestion":
+            return json.dumps(
+                {
+                    "type": "question_open_ended",
+                    "question": args.get("question"),
+                    "reasoning": args.get("reason"),
+                }
+            )
+
+        case "addUserRequirement":
+            requirement = args.get("requirement")
+            if "requirement added" in requirement.lower():
+                return json.dumps({"type": "noop"})
+            return json.dumps(
+                {
+                    "type": "user_requirement",
+                    "requirement": requirement,
+                }
+            )
+
+        case "addUserConstraint":
+            constraint = args.get("constraint")
+            if "constraint added" in constraint.lower():
+                return json.dumps({"type": "noop"})
+            return json.dumps(
+                {
+                    "type": "user_constraint",
+                    "constraint": constraint,
+                }
+            )
+
+        case "recommendations":
+            recs = args.get("recommendations", [])
+            return json.dumps(
+                {
+                    "type": "recommendations_list",
+                    "recommendations": recs,
+                }
+            )
+
+        case "addSources":
+            return json.dumps(
+                {
+                    "type": "sources",
+                    "sources": args.get("sources", []),
+                }
+            )
+
+        case "createUserReport":
+            return json.dumps(
+                {
+                    "type": "user_report",
+                    "message": args.get("message"),
+                }
+            )
+
+    return None
+
+
+# Plain-text JSON turns name the tool instead of the frontend type:
+# tool name -> (frontend type, key the object must carry to be converted)
+TEXT_TURN_TYPES = {
+    "createMultipleChoice": ("question_multiple_choice", None),
+    "createSliderQuestion": ("question_slider", None),
+    "createOpenEndedQuestion": ("question_open_ended", None),
+    "addUserRequirement": ("user_requirement", "requirement"),
+    "addUserConstraint": ("user_constraint", "constraint"),
+    "addSources": ("sources", "sources"),
+    "createUserReport": ("user_report", "message"),
+    "create_user_report": ("user_report", "message"),
+    "recommendations": ("recommendations_list", "recommendations"),
+}
+
+
+def parse_text_response(text, msg, obj=None):
+    """Map a text turn to a frontend payload.
+
+    ``obj`` is the already-decoded JSON when the caller parsed it while
+    streaming; otherwise ``text`` is decoded here.
+    """
+    # Some turns come back as plain-text JSON instead of a function call
+    if obj is None and looks_like_json(text):
         try:
-            decoder = json.JSONDecoder()
-            obj, _ = decoder.raw_decode(text)
-
-            # Transform all plain text JSON function outputs to expected types
-            obj_type = obj.get("type", "")
-
-            # Multiple choice questions
-            if obj_type == "createMultipleChoice":
-                obj["type"] = "question_multiple_choice"
-                if "reason" in obj:
-                    obj["reasoning"] = obj.pop("reason")
-
-            # Slider questions
-            elif obj_type == "createSliderQuestion":
-                obj["type"] = "question_slider"
-                if "reason" in obj:
-                    obj["reasoning"] = obj.pop("reason")
-
-            # Open-ended questions
-            elif obj_type == "createOpenEndedQuestion":
-                obj["type"] = "question_open_ended"
-                if "reason" in obj:
-                    obj["reasoning"] = obj.pop("reason")
-
-            # User requirements
-            elif obj_type == "addUserRequirement" and "requirement" in obj:
-                obj["type"] = "user_requirement"
-
-            # User constraints
-            elif obj_type == "addUserConstraint" and "constraint" in obj:
-                obj["type"] = "user_constraint"
-
-            # Sources
-            elif obj_type == "addSources" and "sources" in obj:
-                obj["type"] = "sources"
-
-            # User report (both camelCase and snake_case)
-            elif (
-                obj_type in ["createUserReport", "create_user_report"]
-                and "message" in obj
-            ):
-                obj["type"] = "user_report"
-
-            # Recommendations
-            elif obj_type == "recommendations" and "recommendations" in obj:
-                recs = obj.get("recommendations", [])
-                obj["type"] = "recommendations_list"
-
-            return json.dumps(obj)
+            obj = parse_json(text, "chatbot")
         except json.JSONDecodeError:
             pass
 
+    if isinstance(obj, dict):
+        new_type, required_key = TEXT_TURN_TYPES.get(obj.get("type", ""), (None, None))
+        if new_type and (required_key is None or required_key in obj):
+            obj["type"] = new_type
+            if new_type.startswith("question_") and "reason" in obj:
+                obj["reasoning"] = obj.pop("reason")
+        return json.dumps(obj)
+
     return json.dumps(
         {
             "type": "question_open_ended",
-            "question": resp.output_text,
+            "question": text,
             "reasoning": "The previous message could not be parsed, please try again.",
             "original_message": msg,
         }
@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from apis.cache import CACHE_DIR
+from Compare import get_comparison
+
+# Comparisons run at once per worker process; the rest wait in the queue
+WORKERS = int(os.getenv("COMPARE_JOB_WORKERS", 2))
+# Finished jobs can be viewed for this long, then they are dropped
+JOB_TTL = int(os.getenv("COMPARE_JOB_TTL", 3600))
+# A running job not updated for this long is reported failed (its worker died)
+STALE_AFTER = int(os.getenv("COMPARE_JOB_STALE_AFTER", 300))
+
+FINISHED = ("done", "failed")
+# Queued jobs are not here: they may wait behind a full pool for any length of time
+RUNNING = ("researching", "compiling")
+
+
+class SQLiteJobStore:
+    """Job records shared by every worker, so any worker can answer a poll."""
+
+    def __init__(self, path=None, ttl=JOB_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "compare_jobs.sqlite3")
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs "
+                "(id TEXT PRIMARY KEY, job TEXT, updated REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, job_id):
+        row = self._db().execute(
+            "SELECT job, updated FROM jobs WHERE id = ? AND updated >= ?",
+            (job_id, time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            return None
+        job = json.loads(row[0])
+        if job["status"] in RUNNING and row[1] < time.time() - STALE_AFTER:
+            job["status"] = "failed"
+            job["error"] = "The comparison stopped responding."
+        return job
+
+    def put(self, job):
+        self._db().execute(
+            "INSERT OR REPLACE INTO jobs (id, job, updated) VALUES (?, ?, ?)",
+            (job["id"], json.dumps(job), time.time()),
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.evict_expired()
+
+    def evict_expired(self):
+        self._db().execute("DELETE FROM jobs WHERE updated < ?", (time.time() - self.ttl,))
+
+
+def item_name(item):
+    """Name of a bare item name or an already-researched item dict."""
+    if isinstance(item, str) and item.strip():
+        return item
+    if isinstance(item, dict) and isinstance(item.get("item"), str):
+        return item["item"]
+    raise ValueError("Each item must be a name or an object with an 'item' name")
+
+
+class CompareJobs:
+    """Runs comparisons on a local thread pool and records their progress.
+
+    A job moves through ``queued`` -> ``researching`` -> ``compiling`` ->
+    ``done`` (with ``result``) or ``failed`` (with ``error``).
+    """
+
+    def __init__(self, store=None, workers=WORKERS):
+        self.store = store or SQLiteJobStore()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compare-job")
+
+    def submit(self, items):
+        """Queue a comparison; raises ``ValueError`` for malformed items."""
+        names = [item_name(item) for item in items]
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "progress": {"done": 0, "total": sum(isinstance(i, str) for i in items), "items": {}},
+            "items": names,
+            "result": None,
+            "error": None,
+            "created": time.time(),
+        }
+        self.store.put(job)
+        self._pool.submit(self._run, job, items)
+        return job
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _run(self, job, items):
+        lock = threading.Lock()
+
+        def on_progress(item_name, result):
+            with lock:
+                job["progress"]["done"] += 1
+                job["progress"]["items"][item_name] = "error" if "error" in result else "done"
+                if job["progress"]["done"] == job["progress"]["total"]:
+                    job["status"] = "compiling"
+                self.store.put(job)
+
+        job["status"] = "researching" if job["progress"]["total"] else "compiling"
+        self.store.put(job)
+        try:
+            result = get_comparison(items, on_progress)
+        except Exception as e:
+            print(f"Error in comparison job {job['id']}: {e}")
+            job["status"] = "failed"
+            job["error"] = "An unexpected error occurred."
+        else:
+            job["status"] = "done"
+            job["result"] = result
+        self.store.put(job)
@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from apis.cache import CACHE_DIR
+
+# Only the newest messages are kept per conversation (user + assistant pairs)
+MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", 40))
+# Conversations untouched for this long are dropped
+IDLE_TTL = int(os.getenv("CONVERSATION_IDLE_TTL", 6 * 3600))
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+class MemoryConversationStore:
+    """Per-process store. Fine for a single worker or the Flask dev server."""
+
+    def __init__(self, max_messages=MAX_MESSAGES, idle_ttl=IDLE_TTL, max_conversations=10000):
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.max_conversations = max_conversations
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._conversations.get(sid)
+            if entry is None:
+                return []
+            updated, messages = entry
+            if updated < time.time() - self.idle_ttl:
+                del self._conversations[sid]
+                return []
+            return list(messages)
+
+    def append(self, sid, *messages):
+        with self._lock:
+            _, history = self._conversations.pop(sid, (0, []))
+            history = (history + list(messages))[-self.max_messages:]
+            self._conversations[sid] = (time.time(), history)
+            self._evict()
+
+    def reset(self, sid):
+        with self._lock:
+            self._conversations.pop(sid, None)
+
+    def _evict(self):
+        # Oldest-touched conversations sit at the front
+        cutoff = time.time() - self.idle_ttl
+        while self._conversations:
+            sid, (updated, _) = next(iter(self._conversations.items()))
+            if updated >= cutoff and len(self._conversations) <= self.max_conversations:
+                break
+            del self._conversations[sid]
+
+
+class SQLiteConversationStore:
+    """Store shared by every worker on the host through one SQLite file."""
+
+    def __init__(self, path=None, max_messages=MAX_MESSAGES, idle_ttl=IDLE_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "conversations.sqlite3")
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations "
+                "(sid TEXT PRIMARY KEY, messages TEXT, updated REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._db().execute(
+            "SELECT messages FROM conversations WHERE sid = ? AND updated >= ?",
+            (sid, time.time() - self.idle_ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def append(self, sid, *messages):
+        db = self._db()
+        # IMMEDIATE takes the write lock up front so concurrent appends from
+        # two workers can't both read the same old history
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT messages FROM conversations WHERE sid = ?", (sid,)
+            ).fetchone()
+            history = json.loads(row[0]) if row else []
+            history = (history + list(messages))[-self.max_messages:]
+            db.execute(
+                "INSERT OR REPLACE INTO conversations (sid, messages, updated) VALUES (?, ?, ?)",
+                (sid, json.dumps(history), time.time()),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.evict_idle()
+
+    def reset(self, sid):
+        self._db().execute("DELETE FROM conversations WHERE sid = ?", (sid,))
+
+    def evict_idle(self):
+        self._db().execute(
+            "DELETE FROM conversations WHERE updated < ?", (time.time() - self.idle_ttl,)
+        )
+
+
+def create_store(backend=None):
+    backend = backend or os.getenv("CONVERSATION_STORE", "sqlite")
+    if backend == "memory":
+        return MemoryConversationStore()
+    if backend == "sqlite":
+        return SQLiteConversationStore()
+    raise ValueError(f"Unknown conversation store backend: {backend}")
@@ -0,0 +1,35 @@
+"""Gunicorn settings for the production image (see Dockerfile).
+
+``main`` is imported once in the master and the workers are forked from it,
+so the interpreter, Flask, the prompt registry, the event catalog and the
+heavy SDK modules are loaded once and shared copy-on-write instead of being
+imported again by every worker. Nothing that holds a socket or a SQLite
+connection is created at import time: clients and connections are built
+lazily in each worker after the fork.
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() not in ("0", "false", "no")
+
+
+def on_starting(server):
+    # Each worker would otherwise sign sessions with its own random key (see
+    # main.py), so a session would break whenever a request hit another worker
+    if not os.getenv("FLASK_SECRET_KEY"):
+        raise RuntimeError("FLASK_SECRET_KEY must be set when running under gunicorn")
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from apis import clients
+
+    # The SDK is otherwise imported by each worker on its first model call
+    clients.preload()
+    # Move everything loaded so far out of the collector's view; a full
+    # collection in a worker would otherwise touch (and copy) every object
+    gc.freeze()
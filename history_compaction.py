@@ -0,0 +1,99 @@
+import json
+import os
+from apis.tokens import count_tokens
+
+# Token budget for the history part of the prompt (system prompt excluded)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 600))
+# Newest user/assistant pairs that are always sent verbatim
+KEEP_RECENT_TURNS = int(os.getenv("HISTORY_KEEP_RECENT_TURNS", 3))
+
+QUESTION_TYPES = ("question_multiple_choice", "question_slider", "question_open_ended")
+
+
+def count_message_tokens(messages):
+    # ~4 tokens of per-message framing on top of the content
+    return sum(count_tokens(m.get("content", "")) + 4 for m in messages)
+
+
+def _user_answer(content):
+    # The browser prefixes answers with the current requirements/constraints
+    marker = "User message: "
+    if marker in content:
+        return content.rsplit(marker, 1)[1].strip()
+    return content.strip()
+
+
+def _pairs(history):
+    return [history[i : i + 2] for i in range(0, len(history), 2)]
+
+
+def summarize_turns(pairs):
+    """Fold old user/assistant pairs into a compact structured state."""
+    state = {"requirements": [], "constraints": [], "answers": [], "sources": []}
+    last_question = None
+
+    for pair in pairs:
+        user, assistant = pair[0], pair[1] if len(pair) > 1 else None
+
+        answer = _user_answer(user.get("content") or "")
+        if last_question and answer:
+            state["answers"].append({"q": last_question, "a": answer})
+        last_question = None
+
+        if assistant is None:
+            continue
+        try:
+            reply = json.loads(assistant.get("content") or "")
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(reply, dict):
+            continue
+
+        match reply.get("type"):
+            case "user_requirement":
+                if reply.get("requirement") not in state["requirements"]:
+                    state["requirements"].append(reply.get("requirement"))
+            case "user_constraint":
+                if reply.get("constraint") not in state["constraints"]:
+                    state["constraints"].append(reply.get("constraint"))
+            case "sources":
+                state["sources"] = reply.get("sources", [])
+            case question_type if question_type in QUESTION_TYPES:
+                last_question = reply.get("question")
+
+    return {key: value for key, value in state.items() if value}
+
+
+def compact_history(history, budget=None, keep_recent=None):
+    """Return a history that fits ``budget`` tokens.
+
+    The newest ``keep_recent`` pairs are always kept verbatim, older pairs
+    are kept while they fit and everything before that is collapsed into a
+    single state message.
+    """
+    budget = HISTORY_TOKEN_BUDGET if budget is None else budget
+    keep_recent = KEEP_RECENT_TURNS if keep_recent is None else keep_recent
+
+    if count_message_tokens(history) <= budget:
+        return history
+
+    pairs = _pairs(history)
+    kept = []
+    used = 0
+    for index in range(len(pairs) - 1, -1, -1):
+        cost = count_message_tokens(pairs[index])
+        if len(kept) >= keep_recent and used + cost > budget:
+            break
+        kept.insert(0, pairs[index])
+        used += cost
+
+    folded = pairs[: len(pairs) - len(kept)]
+    if not folded:
+        return history
+
+    summary = {
+        "role": "system",
+        "content": "Earlier conversation, summarized: "
+        + json.dumps(summarize_turns(folded), separators=(",", ":")),
+    }
+    return [summary, *[message for pair in kept for message in pair]]
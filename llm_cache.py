@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+import os
+from apis.cache import TTLCache
+from apis.resilience import serve_stale
+from apis.singleflight import SingleFlight
+
+# Kill switch: LLM_CACHE_DISABLED=1 sends every call to the API
+DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+RESPONSE_CACHE = TTLCache(
+    "llm_responses",
+    ttl=int(os.getenv("LLM_CACHE_TTL", 24 * 3600)),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512)),
+    # How long an expired answer may still stand in for a failed call
+    stale_ttl=int(os.getenv("LLM_CACHE_STALE_TTL", 7 * 24 * 3600)),
+)
+
+# Identical requests in flight at the same time share one model call
+FLIGHTS = SingleFlight("llm", lock_timeout=120)
+
+
+def text_version(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def canonical_set(items):
+    # Order-insensitive, duplicate-free; dict items (the CLI passes whole
+    # item dicts) are compared by their JSON form
+    return sorted(
+        {
+            item if isinstance(item, str) else json.dumps(item, sort_keys=True)
+            for item in items
+        }
+    )
+
+
+def cache_key(call_site, model, prompt_version, inputs):
+    """Content address for one model call.
+
+    ``inputs`` must already be canonical (sorted sets, case-folded names);
+    dict key order does not matter.
+    """
+    payload = json.dumps(
+        [call_site, model, prompt_version, inputs],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return f"{call_site}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def cached_call(key, fn, should_cache=bool):
+    if DISABLED:
+        return fn()
+    hit, value = RESPONSE_CACHE.get(key)
+    if hit:
+        return value
+
+    def call_and_store():
+        value = fn()
+        # Failed or empty answers are retried next time instead of cached
+        if should_cache(value):
+            RESPONSE_CACHE.set(key, value)
+        return value
+
+    try:
+        value = FLIGHTS.do(key, call_and_store, recheck=lambda: RESPONSE_CACHE.peek(key))
+    except Exception:
+        hit, stale = serve_stale(RESPONSE_CACHE, key)
+        if hit:
+            return stale
+        raise
+    return stale_if_failed(key, value, should_cache)
+
+
+async def cached_call_async(key, fn, should_cache=bool):
+    if DISABLED:
+        return await fn()
+    # SQLite reads and writes run in threads so a slow disk cannot stall the loop
+    hit, value = await RESPONSE_CACHE.get_async(key)
+    if hit:
+        return value
+
+    async def call_and_store():
+        value = await fn()
+        if should_cache(value):
+            await RESPONSE_CACHE.set_async(key, value)
+        return value
+
+    try:
+        value = await FLIGHTS.do_async(
+            key, call_and_store, recheck=lambda: RESPONSE_CACHE.peek(key)
+        )
+    except Exception:
+        hit, stale = await asyncio.to_thread(serve_stale, RESPONSE_CACHE, key)
+        if hit:
+            return stale
+        raise
+    if should_cache(value):
+        return value
+    return await asyncio.to_thread(stale_if_failed, key, value, should_cache)
+
+
+def stale_if_failed(key, value, should_cache):
+    # Callers that turn upstream errors into an error value (``should_cache``
+    # is false) get the last good answer instead, when there is one
+    if should_cache(value):
+        return value
+    hit, stale = serve_stale(RESPONSE_CACHE, key)
+    return stale if hit else value
+
+
+def get_llm_cache_stats():
+    stats = RESPONSE_CACHE.stats()
+    stats["disabled"] = DISABLED
+    stats["singleflight"] = FLIGHTS.stats()
+    return stats
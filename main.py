@@ -1,22 +1,138 @@
 import os
 import json
-from flask import Flask, jsonify, request, session, render_template, Response
+import math
+from flask import (
+    Flask,
+    jsonify,
+    request,
+    session,
+    render_template,
+    Response,
+    g,
+    stream_with_context,
+    abort,
+    send_file,
+)
+from werkzeug.security import safe_join
 from dotenv import load_dotenv
+
+# Before the app modules, several of which read settings at import time
+load_dotenv()
+
+import assets
 from Compare import get_comparison
-from chatbot import ai_bot_response
-from apis.serp_api import get_serp_image_url
+from compare_jobs import CompareJobs
+from chatbot import ai_bot_response, ai_bot_response_stream
+from conversation_store import create_store, new_session_id
+from suggestions import SuggestionBuffers
+from llm_cache import get_llm_cache_stats
+from semantic_cache import get_semantic_cache_stats
+import speculation
+from apis import metrics, model_router, resilience
+from apis.resilience import UpstreamUnavailable
+from apis.serp_api import (
+    get_serp_image_url,
+    get_serp_image_urls,
+    get_image_cache_stats,
+)
 
 
-load_dotenv()
 print(f"OPENAI_API_KEY: {os.getenv('OPENAI_API_KEY')}")
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+# Templates link static files through asset_url() (fingerprinted when built)
+app.add_template_global(assets.asset_url)
+# Must be the same in every worker, otherwise a session only works on the
+# worker that created it (gunicorn.conf.py refuses to start without it)
+app.secret_key = os.getenv("FLASK_SECRET_KEY")
+if not app.secret_key:
+    print(
+        "WARNING: FLASK_SECRET_KEY is not set, using a random key: sessions only "
+        "work in this process and are lost when it restarts"
+    )
+    app.secret_key = os.urandom(24)
+
+# Conversation history lives server side; the cookie only carries the id
+conversations = create_store()
+
+MAX_BATCH_IMAGES = 20
+
+# Long comparisons run in the background; clients poll their status (the
+# async server also streams it, see asgi.py)
+compare_jobs = CompareJobs()
+
+# Shopping-list suggestions are fetched in batches and served one per click
+suggestion_buffers = SuggestionBuffers()
+SUGGESTION_TIMEOUT_ERROR = "Suggestions are taking too long, please try again."
+
+
+@app.before_request
+def start_request_timer():
+    g.metrics_token = metrics.start_request()
+
+
+@app.after_request
+def record_request_timing(response):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.finish_request(token, route, request.method, response.status_code)
+    return response
+
+
+@app.errorhandler(UpstreamUnavailable)
+def upstream_unavailable(e):
+    # Breaker open or too many calls in flight: answer now instead of queueing
+    response = jsonify({"error": "The service is busy, please try again shortly."})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(math.ceil(e.retry_after))
+    return response
+
+
+def get_session_id():
+    sid = session.get("sid")
+    if not sid:
+        sid = new_session_id()
+        session["sid"] = sid
+    return sid
+
+
+def record_turn(sid, user_input, bot_response):
+    if bot_response and bot_response != json.dumps({"type": "noop"}):
+        conversations.append(
+            sid,
+            {"role": "user", "content": user_input},
+            {"role": "assistant", "content": bot_response},
+        )
+
+
+@app.route("/assets/<path:filename>")
+def fingerprinted_asset(filename):
+    """Files built by ``python assets.py build``.
+
+    A built name never changes content, so it is cached for a year without
+    revalidation; the precompressed variant the browser accepts is sent.
+    The manifest keeps its name across builds and is for the server only.
+    """
+    path = safe_join(assets.DIST_DIR, filename)
+    if path is None or filename.startswith(assets.MANIFEST_NAME) or not os.path.isfile(path):
+        abort(404)
+    variant, encoding = assets.pick_variant(path, request.accept_encodings)
+    response = send_file(
+        variant, mimetype=assets.mimetype(filename), max_age=assets.MAX_AGE, conditional=True
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.immutable = True
+    return response
 
 
 @app.route("/")
 def home():
-    session["conversation_history"] = []
+    sid = get_session_id()
+    conversations.reset(sid)
+    speculation.reset(sid)
     return render_template("chatbot.html")
 
 
@@ -33,27 +149,95 @@ def compare_items():
     try:
         comparison_result = get_comparison(items)
         return jsonify(comparison_result)
+    except UpstreamUnavailable as e:
+        return upstream_unavailable(e)
     except Exception as e:
         print(f"Error during comparison: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 
+@app.route("/compare-jobs", methods=["POST"])
+def create_compare_job():
+    data = request.json or {}
+    items = data.get("items")
+    if not isinstance(items, list) or len(items) < 2:
+        return jsonify({"error": "At least two items are required"}), 400
+
+    try:
+        job = compare_jobs.submit(items)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"job_id": job["id"], "status_url": f"/compare-jobs/{job['id']}"}), 202
+
+
+@app.route("/compare-jobs/<job_id>")
+def get_compare_job(job_id):
+    job = compare_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job)
+
+
 @app.route("/get_response", methods=["POST"])
 def get_response():
     data = request.json
     user_input = data.get("user_input")
-    conversation_history = session.get("conversation_history", [])
+    sid = get_session_id()
+    conversation_history = conversations.get(sid)
 
-    bot_response = ai_bot_response(user_input, conversation_history)
+    # An answer to a multiple-choice question may have been computed already
+    bot_response = speculation.take_turn(sid, user_input, conversation_history)
+    if bot_response is None:
+        bot_response = ai_bot_response(user_input, conversation_history)
 
     # Update history and return the assistant's reply
-    if bot_response and bot_response != json.dumps({"type": "noop"}):
-        conversation_history.append({"role": "user", "content": user_input})
-        conversation_history.append({"role": "assistant", "content": bot_response})
-        session["conversation_history"] = conversation_history
+    record_turn(sid, user_input, bot_response)
+    speculation.speculate(sid, data.get("context"), bot_response, conversations.get)
     return jsonify({"response": bot_response})
 
 
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/get_response/stream", methods=["POST"])
+def get_response_stream():
+    """Server-sent events variant of /get_response.
+
+    Emits ``delta`` events for partial text, ``tool`` events when the model
+    starts a function call and one final ``response`` event carrying the
+    same body /get_response returns.
+    """
+    data = request.json
+    user_input = data.get("user_input")
+    sid = get_session_id()
+    conversation_history = conversations.get(sid)
+
+    def generate():
+        try:
+            speculated = speculation.take_turn(sid, user_input, conversation_history)
+            if speculated is not None:
+                events = [("response", speculated)]
+            else:
+                events = ai_bot_response_stream(user_input, conversation_history)
+            for kind, payload in events:
+                if kind == "response":
+                    record_turn(sid, user_input, payload)
+                    yield sse("response", {"response": payload})
+                    speculation.speculate(sid, data.get("context"), payload, conversations.get)
+                else:
+                    yield sse(kind, {kind: payload})
+        except Exception as e:
+            print(f"Error during streamed response: {e}")
+            yield sse("error", {"error": "An unexpected error occurred."})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/shopping-list", methods=["GET"])
 def shopping_list_page():
     return render_template("shopping_list.html")
@@ -66,11 +250,10 @@ def get_shopping_list_item():
     rejected = data.get("rejected", [])
     accepted = data.get("accepted", [])
     try:
-        # You may need to refactor shopping_list.py to expose recommend_next_item for import
-        from shopping_list import recommend_next_item
-
-        item = recommend_next_item(event, accepted, rejected)
+        item = suggestion_buffers.next_item(get_session_id(), event, accepted, rejected)
         return jsonify(item)
+    except TimeoutError:
+        return jsonify({"error": SUGGESTION_TIMEOUT_ERROR}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -86,6 +269,58 @@ def get_image_serp():
     return jsonify({"image_url": None}), 404
 
 
+@app.route("/get_images_serp", methods=["POST"])
+def get_images_serp():
+    data = request.json or {}
+    item_names = data.get("item_names")
+    if not isinstance(item_names, list) or not item_names:
+        return jsonify({"error": "Missing item_names list"}), 400
+    if len(item_names) > MAX_BATCH_IMAGES:
+        return jsonify({"error": f"At most {MAX_BATCH_IMAGES} items per request"}), 400
+    images = get_serp_image_urls([str(name) for name in item_names])
+    return jsonify({"images": images})
+
+
+@app.route("/image_cache_stats")
+def image_cache_stats():
+    return jsonify(get_image_cache_stats())
+
+
+@app.route("/llm_cache_stats")
+def llm_cache_stats():
+    return jsonify(get_llm_cache_stats())
+
+
+@app.route("/semantic_cache_stats")
+def semantic_cache_stats():
+    return jsonify(get_semantic_cache_stats())
+
+
+@app.route("/speculation_stats")
+def speculation_stats():
+    return jsonify(speculation.get_speculation_stats())
+
+
+@app.route("/suggestion_stats")
+def suggestion_stats():
+    return jsonify(suggestion_buffers.stats())
+
+
+@app.route("/upstream_health")
+def upstream_health():
+    return jsonify(resilience.stats())
+
+
+@app.route("/model_routing")
+def model_routing():
+    return jsonify(model_router.stats())
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY not found. Please set it in .env.")
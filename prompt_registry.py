@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import threading
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+# Re-read a prompt when its file changes; handy while editing prompts locally
+HOT_RELOAD = os.getenv("PROMPT_HOT_RELOAD", "").lower() in ("1", "true", "yes")
+
+
+class PromptRegistry:
+    """Every file in ``prompts/``, loaded once.
+
+    ``.txt`` files are served as text and ``.json`` files (tool schemas) as
+    parsed objects. Texts are returned byte-for-byte identical on every
+    request so the OpenAI prompt-prefix cache keeps hitting. Callers must not
+    mutate what they get back.
+    """
+
+    def __init__(self, directory=PROMPTS_DIR, hot_reload=HOT_RELOAD):
+        self.directory = directory
+        self.hot_reload = hot_reload
+        self._entries = {}
+        self._lock = threading.Lock()
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith((".txt", ".json")):
+                self._load(filename)
+
+    def _load(self, filename):
+        path = os.path.join(self.directory, filename)
+        mtime = os.path.getmtime(path)
+        with open(path, "r", encoding="utf-8") as f:
+            raw = f.read().replace("\r\n", "\n")
+        value = json.loads(raw) if filename.endswith(".json") else raw
+        version = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            self._entries[filename] = (value, version, mtime)
+
+    def _get(self, filename):
+        entry = self._entries.get(filename)
+        if entry is None:
+            raise KeyError(f"No prompt file named {filename} in {self.directory}")
+        if self.hot_reload:
+            path = os.path.join(self.directory, filename)
+            if os.path.getmtime(path) != entry[2]:
+                self._load(filename)
+                entry = self._entries[filename]
+        return entry
+
+    def prompt(self, name):
+        return self._get(f"{name}.txt")[0]
+
+    def schema(self, name):
+        return self._get(f"{name}.json")[0]
+
+    def version(self, filename):
+        # Content hash, e.g. for cache keys that must change with the prompt
+        return self._get(filename)[1]
+
+
+registry = PromptRegistry()
+
+
+def get_prompt(name):
+    return registry.prompt(name)
+
+
+def get_schema(name):
+    return registry.schema(name)
+
+
+def prompt_version(name):
+    return registry.version(name if "." in name else f"{name}.txt")
@@ -24,6 +24,9 @@ if [ "$1" == "dev" ]; then
     export FLASK_ENV=development
     export FLASK_DEBUG=1
     flask run --host=0.0.0.0 --port=${PORT:-5000}
+elif [ "$1" == "async" ]; then
+    # Async API routes on one event loop; pages/static still served by Flask
+    uvicorn asgi:app --host 0.0.0.0 --port ${PORT:-5000} --workers ${WORKERS:-1}
 else
     waitress-serve --listen=0.0.0.0:${PORT:-5000} main:app
 fi
\ No newline at end of file
@@ -0,0 +1,187 @@
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+
+# Opt-in: SEMANTIC_CACHE=1 lets near-identical early turns share one answer
+ENABLED = os.getenv("SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
+# Cosine similarity a new turn needs to reuse a cached answer
+THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
+# Only turns with fewer earlier user messages than this are cached
+MAX_DEPTH = int(os.getenv("SEMANTIC_CACHE_MAX_DEPTH", 2))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2048))
+TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 24 * 3600))
+# Hashed feature space; MAX_ENTRIES x DIMS float32 is the matrix footprint
+DIMS = int(os.getenv("SEMANTIC_CACHE_DIMS", 1024))
+
+_WORD = re.compile(r"\w+")
+
+
+def conversation_depth(history):
+    return sum(1 for message in history if message.get("role") == "user")
+
+
+def state_text(msg, history):
+    """The early conversation as one normalized string."""
+    parts = [message.get("content") or "" for message in history]
+    parts.append(msg or "")
+    return " ".join(" ".join(parts).casefold().split())
+
+
+class SemanticCache:
+    """Chatbot answers keyed by a local TF-IDF embedding of the conversation.
+
+    Each state is hashed into ``dims`` unigram + bigram buckets (no remote
+    embeddings call); term counts live in a fixed-size NumPy matrix and IDF
+    weights are derived from the rows currently held. A lookup is one
+    matrix-vector product. When full, the least recently used row is
+    overwritten, so memory never grows past ``max_entries x dims`` floats.
+
+    Per process, like the in-memory tier of ``apis.cache.TTLCache``.
+    """
+
+    def __init__(
+        self,
+        threshold=THRESHOLD,
+        max_depth=MAX_DEPTH,
+        max_entries=MAX_ENTRIES,
+        ttl=TTL,
+        dims=DIMS,
+    ):
+        self.threshold = threshold
+        self.max_depth = max_depth
+        self.ttl = ttl
+        self.dims = dims
+        self._counts = np.zeros((max_entries, dims), dtype=np.float32)
+        self._depths = np.full(max_entries, -1, dtype=np.int16)
+        # 0 marks a free row
+        self._created = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._latency = np.zeros(max_entries)
+        self._responses = [None] * max_entries
+        self._doc_freq = np.zeros(dims, dtype=np.float32)
+        # Normalized TF-IDF rows, rebuilt after any insert or eviction
+        self._weighted = None
+        self._idf = None
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "too_deep": 0, "stores": 0}
+        self._saved_seconds = 0.0
+
+    def vectorize(self, text):
+        words = _WORD.findall(text)
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dims, dtype=np.float32)
+        if not features:
+            return vector
+        # crc32 is stable across processes, unlike hash()
+        buckets = [zlib.crc32(feature.encode("utf-8")) % self.dims for feature in features]
+        np.add.at(vector, buckets, 1)
+        # Sublinear term frequency
+        nonzero = vector > 0
+        vector[nonzero] = 1 + np.log(vector[nonzero])
+        return vector
+
+    def lookup(self, msg, history):
+        """Return a cached response for this turn, or None."""
+        depth = conversation_depth(history)
+        with self._lock:
+            self._stats["lookups"] += 1
+            if depth >= self.max_depth:
+                self._stats["too_deep"] += 1
+                return None
+        counts = self.vectorize(state_text(msg, history))
+
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            weighted = self._weighted_rows()
+            query = counts * self._idf
+            norm = np.linalg.norm(query)
+            if weighted is None or norm == 0:
+                self._stats["misses"] += 1
+                return None
+            similarity = weighted @ (query / norm)
+            # Only states at the same depth are comparable
+            similarity[self._depths != depth] = -1
+            best = int(np.argmax(similarity))
+            if similarity[best] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+            self._last_used[best] = now
+            self._stats["hits"] += 1
+            self._saved_seconds += float(self._latency[best])
+            return self._responses[best]
+
+    def store(self, msg, history, response, latency):
+        """Remember ``response`` for this turn; ``latency`` is what the call cost."""
+        depth = conversation_depth(history)
+        if depth >= self.max_depth:
+            return
+        counts = self.vectorize(state_text(msg, history))
+
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            free = np.flatnonzero(self._created == 0)
+            row = int(free[0]) if len(free) else int(np.argmin(self._last_used))
+            self._clear(row)
+            self._counts[row] = counts
+            self._doc_freq += counts > 0
+            self._depths[row] = depth
+            self._created[row] = now
+            self._last_used[row] = now
+            self._latency[row] = latency
+            self._responses[row] = response
+            self._weighted = None
+            self._stats["stores"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            entries = int(np.count_nonzero(self._created))
+            saved = self._saved_seconds
+        answered = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / answered if answered else 0.0
+        stats["entries"] = entries
+        stats["saved_seconds"] = round(saved, 3)
+        stats["avg_saved_seconds"] = round(saved / stats["hits"], 3) if stats["hits"] else 0.0
+        return stats
+
+    # Callers hold self._lock for everything below
+    def _clear(self, row):
+        if self._created[row]:
+            self._doc_freq -= self._counts[row] > 0
+            self._counts[row] = 0
+            self._created[row] = 0
+            self._last_used[row] = 0
+            self._depths[row] = -1
+            self._responses[row] = None
+            self._weighted = None
+
+    def _expire(self, now):
+        for row in np.flatnonzero((self._created > 0) & (self._created < now - self.ttl)):
+            self._clear(int(row))
+
+    def _weighted_rows(self):
+        if self._weighted is None:
+            rows = int(np.count_nonzero(self._created))
+            # Smoothed IDF over the rows currently held
+            self._idf = (np.log((1 + rows) / (1 + self._doc_freq)) + 1).astype(np.float32)
+            if rows == 0:
+                return None
+            weighted = self._counts * self._idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            self._weighted = weighted / norms
+        return self._weighted
+
+
+SEMANTIC_CACHE = SemanticCache() if ENABLED else None
+
+
+def get_semantic_cache_stats():
+    if SEMANTIC_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **SEMANTIC_CACHE.stats()}
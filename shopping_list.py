@@ -1,11 +1,19 @@
 import json
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-
-# Load API keys from .env
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from apis.cache import normalize_query
+from apis.clients import openai_client
+from apis import model_router
+from apis.resilience import guard
+from structured import parse_json, response_format
+from llm_cache import (
+    cache_key,
+    cached_call,
+    canonical_set,
+    text_version,
+)
+
+# Cache keys and catalog metadata name the primary model even while the
+# router falls back to another tier
+MODEL = model_router.primary_model("shopping_list")
 
 
 def build_prompt(event_type, rejected_items, accepted_items, count=1):
@@ -16,15 +24,15 @@ Recommend {count} essential item{"s" if count > 1 else ""}.
 Do NOT include any of the following:
 {json.dumps(rejected_items + accepted_items)}
 
-Respond with ONLY valid JSON, enclosed in triple backticks, like this:
-```json
-[
-  {{
-    "item": "Item name",
-    "reason": "Very short reason"
-  }}
-]
-```
+Respond with a JSON object like this:
+{{
+  "items": [
+    {{
+      "item": "Item name",
+      "reason": "Very short reason"
+    }}
+  ]
+}}
 The 'reason' should be a very concise, 1-6 word explanation."""
 
     return base.strip()
@@ -40,49 +48,73 @@ def clean_item(raw_item):
         return None
 
 
+# Changes whenever the prompt template is edited, invalidating cached answers
+PROMPT_VERSION = text_version(build_prompt("{event}", [], [], 2))
+
+
 def recommend_items(event, accepted, rejected, count=1):
+    return cached_call(
+        items_cache_key(event, accepted, rejected, count),
+        lambda: request_items(event, accepted, rejected, count),
+    )
+
+
+def items_cache_key(event, accepted, rejected, count):
+    return cache_key(
+        "shopping_list",
+        MODEL,
+        PROMPT_VERSION,
+        {
+            "event": normalize_query(event),
+            "accepted": canonical_set(accepted),
+            "rejected": canonical_set(rejected),
+            "count": count,
+        },
+    )
+
+
+def build_messages(event, accepted, rejected, count):
     prompt = build_prompt(event, accepted, rejected, count)
-    messages = [
+    return [
         {"role": "system", "content": "You're a helpful shopping assistant."},
         {"role": "user", "content": prompt},
     ]
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.2,  # lower temp for consistency
-        )
-        raw = response.choices[0].message.content.strip()
-
-        # Extract JSON if wrapped in ```
-        if "```" in raw:
-            raw = raw.split("```")[1]
-            raw = raw.replace("json", "").strip()
-
-        # Parse JSON
-        data = json.loads(raw)
-        if isinstance(data, dict):
-            items = [data]
-        elif isinstance(data, list):
-            items = data
-        else:
-            print("Unexpected GPT response format:", raw)
-            return []
-
-        cleaned_items = []
-        for raw_item in items:
-            cleaned = clean_item(raw_item)
-            if cleaned and cleaned["item"] not in accepted + rejected:
-                cleaned_items.append(cleaned)
-
-        return cleaned_items
 
+def request_items(event, accepted, rejected, count=1):
+    try:
+        route = model_router.route("shopping_list")
+        with guard("openai", "shopping_list"), route.timed():
+            response = openai_client().chat.completions.create(
+                model=route.model,
+                messages=build_messages(event, accepted, rejected, count),
+                temperature=0.2,  # lower temp for consistency
+                response_format=response_format("shopping_list"),
+            )
+        route.record_usage(response)
+        return parse_items(response.choices[0].message.content, accepted, rejected)
     except Exception as e:
         print("Error generating item:", e)
         return []
 
 
+def parse_items(raw, accepted, rejected):
+    # Strict structured output: {"items": [...]}
+    data = parse_json(raw, "shopping_list")
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        print("Unexpected GPT response format:", raw)
+        return []
+
+    cleaned_items = []
+    for raw_item in items:
+        cleaned = clean_item(raw_item)
+        if cleaned and cleaned["item"] not in accepted + rejected:
+            cleaned_items.append(cleaned)
+
+    return cleaned_items
+
+
 def recommend_next_item(event, accepted, rejected):
     items = recommend_items(event, accepted, rejected, count=1)
     if not items:
@@ -0,0 +1,315 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from apis.cache import TTLCache
+from apis.metrics import counter
+from apis.resilience import CircuitBreaker, breaker
+from chatbot import remember_answer, respond_async
+
+# Opt-in: SPECULATION=1 precomputes the next turn for multiple-choice answers
+ENABLED = os.getenv("SPECULATION", "").lower() in ("1", "true", "yes")
+# Options speculated per question, in the order the model listed them
+TOP_N = int(os.getenv("SPECULATION_TOP_N", 2))
+# Speculative calls one session may start, ever (its cost cap)
+SESSION_BUDGET = int(os.getenv("SPECULATION_SESSION_BUDGET", 6))
+# Speculative calls in flight per process; past this new questions are skipped
+MAX_IN_FLIGHT = int(os.getenv("SPECULATION_MAX_IN_FLIGHT", 16))
+# How long a finished speculative turn can still be served
+TTL = int(os.getenv("SPECULATION_TTL", 600))
+IDLE_TTL = int(os.getenv("SPECULATION_IDLE_TTL", 1800))
+MAX_SESSIONS = int(os.getenv("SPECULATION_MAX_SESSIONS", 1000))
+
+CALL_SITE = "chatbot_speculative"
+
+SPECULATIONS = counter(
+    "speculative_turns_total", "Speculative chatbot turns, by outcome."
+)
+ANSWERS = counter(
+    "speculative_answers_total",
+    "Answers to multiple-choice questions, by whether a speculative turn served them.",
+)
+SPECULATIVE_TOKENS = counter(
+    "speculative_tokens_total", "Tokens spent on speculative turns, by whether the turn was used."
+)
+
+# Shared by every worker, so an answer landing on another worker still hits
+TURNS = TTLCache("speculative_turns", ttl=TTL, max_entries=256)
+
+
+def answer_input(context, option):
+    # Must match sendMessage() in static/chatbot.js
+    return f"{context}User message: {option}"
+
+
+def turn_key(sid, history, user_input):
+    raw = json.dumps([sid, history, user_input], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def multiple_choice_options(response):
+    if not response or "question_multiple_choice" not in response:
+        return []
+    try:
+        payload = json.loads(response)
+    except json.JSONDecodeError:
+        return []
+    if payload.get("type") != "question_multiple_choice":
+        return []
+    return [option for option in payload.get("options") or [] if isinstance(option, str)]
+
+
+def answers_question(history):
+    """True when the last assistant turn in ``history`` was a multiple-choice question."""
+    if not history or history[-1].get("role") != "assistant":
+        return False
+    return bool(multiple_choice_options(history[-1].get("content")))
+
+
+class _Entry:
+    def __init__(self, key, future):
+        self.key = key
+        self.future = future
+
+
+class _Session:
+    def __init__(self):
+        self.spent = 0
+        # user_input -> _Entry for the question currently on screen
+        self.entries = {}
+        self.touched = time.time()
+
+
+class SpeculativeTurns:
+    """Next chatbot turns computed while the user reads a multiple-choice question.
+
+    ``start`` is called with each turn sent to the client. For a
+    multiple-choice question it sends the first ``top_n`` answers the client
+    could post (same context, same history) to the model on a background
+    event loop. ``take`` is called before a turn is computed: an answer that
+    matches a finished speculation is served from ``TURNS``, one that matches
+    a call still in flight waits for it, anything else returns ``None`` and
+    the caller asks the model as usual. The speculations the user did not
+    pick are cancelled (aborting their HTTP requests) or, if already done,
+    counted as wasted tokens.
+
+    Finished turns live in a disk-backed ``TTLCache`` so any worker can serve
+    them; in-flight calls, budgets and wasted-token accounting are per
+    process. A session spread over N workers can spend up to N budgets.
+    """
+
+    def __init__(
+        self,
+        top_n=TOP_N,
+        session_budget=SESSION_BUDGET,
+        max_in_flight=MAX_IN_FLIGHT,
+        idle_ttl=IDLE_TTL,
+        max_sessions=MAX_SESSIONS,
+    ):
+        self.top_n = top_n
+        self.session_budget = session_budget
+        self.max_in_flight = max_in_flight
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.in_flight = 0
+        self._sessions = OrderedDict()
+        # Reentrant: a future that is already done runs _finished right away
+        self._lock = threading.RLock()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def start(self, sid, history, context, response):
+        """Speculate on the answers to ``response`` if it is a multiple-choice question.
+
+        ``history`` must already include the question turn.
+        """
+        options = multiple_choice_options(response)
+        with self._lock:
+            session = self._session(sid)
+            self._settle(session)
+            if not options:
+                return
+            if breaker("openai").state != CircuitBreaker.CLOSED:
+                SPECULATIONS.inc(outcome="skipped_unhealthy")
+                return
+            wanted = options[: self.top_n]
+            budget_left = self.session_budget - session.spent
+            slots_left = self.max_in_flight - self.in_flight
+            room = max(min(budget_left, slots_left), 0)
+            if len(wanted) > room:
+                reason = "over_budget" if budget_left <= slots_left else "overloaded"
+                SPECULATIONS.inc(len(wanted) - room, outcome=reason)
+            for option in wanted[:room]:
+                user_input = answer_input(context or "", option)
+                key = turn_key(sid, history, user_input)
+                future = asyncio.run_coroutine_threadsafe(
+                    self._speculate(key, user_input, history), self._background_loop()
+                )
+                self.in_flight += 1
+                future.add_done_callback(self._finished)
+                session.entries[user_input] = _Entry(key, future)
+                session.spent += 1
+                SPECULATIONS.inc(outcome="started")
+
+    def take(self, sid, user_input, history):
+        """The precomputed turn for this answer, or ``None``."""
+        if not answers_question(history):
+            return None
+        key = turn_key(sid, history, user_input)
+        with self._lock:
+            session = self._sessions.get(sid)
+            entry = session.entries.pop(user_input, None) if session else None
+            if entry is not None and entry.key != key:
+                # Speculated against a different history (reset since):
+                # cancelled or written off with the other options below
+                session.entries[user_input] = entry
+                entry = None
+            if session is not None:
+                # The user has answered: the other options are no longer needed
+                self._settle(session)
+
+        hit, value = TURNS.get(key)
+        result = "hit"
+        if not hit and entry is not None:
+            # Still running here: waiting beats starting the same call again
+            result = "hit" if entry.future.done() else "hit_in_flight"
+            try:
+                value = entry.future.result()
+            except CancelledError:
+                value = None
+            hit = value is not None
+        if not hit:
+            ANSWERS.inc(result="miss")
+            return None
+
+        ANSWERS.inc(result=result)
+        SPECULATIONS.inc(outcome="used")
+        SPECULATIVE_TOKENS.inc(value["tokens"], kind="used")
+        TURNS.set(key, {**value, "used": True})
+        # Kept out of the semantic cache until now, like a turn never taken
+        remember_answer(user_input, history, value["response"], value.get("latency"))
+        return value["response"]
+
+    def reset(self, sid):
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is not None:
+                self._settle(session)
+
+    def stats(self):
+        answers = {
+            result: ANSWERS.value(result=result) for result in ("hit", "hit_in_flight", "miss")
+        }
+        total = sum(answers.values())
+        with self._lock:
+            sessions = len(self._sessions)
+            in_flight = self.in_flight
+        return {
+            "answers": answers,
+            "hit_rate": (answers["hit"] + answers["hit_in_flight"]) / total if total else 0.0,
+            "speculations": {
+                outcome: SPECULATIONS.value(outcome=outcome)
+                for outcome in (
+                    "started", "used", "wasted", "cancelled", "failed",
+                    "over_budget", "overloaded", "skipped_unhealthy",
+                )
+            },
+            "tokens": {kind: SPECULATIVE_TOKENS.value(kind=kind) for kind in ("used", "wasted")},
+            "in_flight": in_flight,
+            "sessions": sessions,
+            "top_n": self.top_n,
+            "session_budget": self.session_budget,
+        }
+
+    async def _speculate(self, key, user_input, history):
+        try:
+            response, tokens, latency = await respond_async(
+                user_input, history, call_site=CALL_SITE, remember=False
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Speculative turn failed: {e}")
+            SPECULATIONS.inc(outcome="failed")
+            return None
+        value = {"response": response, "tokens": tokens, "latency": latency}
+        await TURNS.set_async(key, value)
+        return value
+
+    def _finished(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+    # Callers hold self._lock
+    def _session(self, sid):
+        session = self._sessions.pop(sid, None) or _Session()
+        session.touched = time.time()
+        self._sessions[sid] = session
+        self._evict()
+        return session
+
+    def _settle(self, session):
+        """Cancel or write off every speculation left in ``session``."""
+        for entry in session.entries.values():
+            if entry.future.cancel():
+                SPECULATIONS.inc(outcome="cancelled")
+                continue
+            # cancel() only fails once the call has finished
+            value = entry.future.result()
+            if value is None:
+                continue
+            # Another worker may have served it
+            hit, cached = TURNS.get(entry.key)
+            if not (hit and cached.get("used")):
+                SPECULATIONS.inc(outcome="wasted")
+                SPECULATIVE_TOKENS.inc(value["tokens"], kind="wasted")
+        session.entries = {}
+
+    def _evict(self):
+        cutoff = time.time() - self.idle_ttl
+        while self._sessions:
+            sid, session = next(iter(self._sessions.items()))
+            if session.touched >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            self._settle(session)
+            del self._sessions[sid]
+
+    def _background_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, daemon=True, name="speculation-loop"
+                ).start()
+        return self._loop
+
+
+SPECULATOR = SpeculativeTurns() if ENABLED else None
+
+
+def take_turn(sid, user_input, history):
+    if SPECULATOR is None:
+        return None
+    return SPECULATOR.take(sid, user_input, history)
+
+
+def speculate(sid, context, response, load_history):
+    """Start speculating after ``response`` was recorded; ``load_history(sid)`` is only called for questions."""
+    if SPECULATOR is None or not multiple_choice_options(response):
+        return
+    SPECULATOR.start(sid, load_history(sid), context, response)
+
+
+def reset(sid):
+    if SPECULATOR is not None:
+        SPECULATOR.reset(sid)
+
+
+def get_speculation_stats():
+    if SPECULATOR is None:
+        return {"enabled": False}
+    return {"enabled": True, **SPECULATOR.stats()}
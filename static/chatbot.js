@@ -7,6 +7,19 @@ const STATUS_MSGS = [
   "Finalizing response",
 ];
 
+// Opt-in: render partial output from /get_response/stream while waiting
+const STREAM_RESPONSES = false;
+const TOOL_STATUS_MSGS = {
+  createMultipleChoice: "Preparing next question",
+  createSliderQuestion: "Preparing next question",
+  createOpenEndedQuestion: "Preparing next question",
+  addUserRequirement: "Evaluating user needs",
+  addUserConstraint: "Evaluating user needs",
+  addSources: "Collecting data",
+  createUserReport: "Evaluating results",
+  recommendations: "Compiling recommendations",
+};
+
 let requirements = [];
 let constraints = [];
 let sources = [];
@@ -97,9 +110,8 @@ function hideSpinner() {
   msgTimer = null;
 }
 
-function sendMessage(msg) {
-  showSpinner();
-
+// Sent with every request so the server can speculate on the next answer
+function currentContext() {
   let context = "";
   if (requirements.length > 0) {
     context += "Current Requirements:\n- " + requirements.join("\n- ") + "\n\n";
@@ -110,16 +122,36 @@ function sendMessage(msg) {
   if (sources.length > 0) {
     context += "Current Sources:\n- " + sources.map(s => `${s.name}: ${s.url}`).join("\n- ") + "\n\n";
   }
+  return context;
+}
 
-  const fullMessage = context + "User message: " + msg;
+function sendMessage(msg) {
+  showSpinner();
 
-  fetch("/get_response", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ user_input: fullMessage }),
-  })
-    .then((res) => res.json())
+  // speculation.answer_input() builds the same string
+  const fullMessage = currentContext() + "User message: " + msg;
+
+  requestResponse(fullMessage);
+}
+
+function requestResponse(userInput) {
+  const request = STREAM_RESPONSES
+    ? streamResponse(userInput)
+    : fetch("/get_response", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ user_input: userInput, context: currentContext() }),
+      }).then((res) => res.json());
+
+  request
     .then((data) => {
+      if (data.error) {
+        // e.g. 503 while the model API is unavailable
+        hideSpinner();
+        document.getElementById("chat-messages").innerHTML =
+          `<div class="question-container"><p>${data.error}</p></div>`;
+        return;
+      }
       try {
         const resp = JSON.parse(data.response);
         handleResponse(resp, data.response);
@@ -137,6 +169,57 @@ function sendMessage(msg) {
     });
 }
 
+async function streamResponse(userInput) {
+  const res = await fetch("/get_response/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ user_input: userInput, context: currentContext() }),
+  });
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let partial = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+
+      switch (event) {
+        case "delta":
+          partial += data.delta;
+          showProgressText(partial);
+          break;
+        case "tool":
+          showProgressText(TOOL_STATUS_MSGS[data.tool] || STATUS_MSGS[0]);
+          break;
+        case "response":
+          return data;
+        case "error":
+          throw new Error(data.error);
+      }
+    }
+  }
+  throw new Error("Stream ended without a response");
+}
+
+function showProgressText(text) {
+  const statusMsg = document.querySelector(".progress-message");
+  if (!statusMsg) return;
+  if (msgTimer) clearInterval(msgTimer);
+  msgTimer = null;
+  statusMsg.textContent = text;
+}
+
 function submitAnswer(e) {
   e.preventDefault();
   const input = document.getElementById("user-input");
@@ -312,28 +395,7 @@ function showReport(msg) {
 }
 
 function continueConvo() {
-  fetch("/get_response", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ user_input: "" }),
-  })
-    .then((res) => res.json())
-    .then((data) => {
-      try {
-        const resp = JSON.parse(data.response);
-        handleResponse(resp, data.response);
-      } catch (e) {
-        hideSpinner();
-        document.getElementById("chat-messages").innerHTML =
-          `<div class="question-container"><p>${data.response}</p></div>`;
-      }
-    })
-    .catch((err) => {
-      hideSpinner();
-      document.getElementById("chat-messages").innerHTML =
-        `<div class="question-container"><p>Sorry, something went wrong.</p></div>`;
-      console.error("Error:", err);
-    });
+  requestResponse("");
 }
 
 function handleResponse(resp, raw) {
@@ -489,6 +551,25 @@ async function getPerplexityProductData(itemName) {
   }
 }
 
+async function getProductImages(itemNames) {
+  try {
+    const response = await fetch("/get_images_serp", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ item_names: itemNames }),
+    });
+    if (!response.ok) {
+      console.error(`Error fetching images from SerpAPI: ${response.statusText}`);
+      return {};
+    }
+    const data = await response.json();
+    return data.images || {};
+  } catch (error) {
+    console.error("Error getting product images from SerpAPI:", error);
+    return {};
+  }
+}
+
 async function showResults(data) {
   const chat = document.getElementById("chat-messages");
   chat.innerHTML = `<div class="recommendations-wrapper">
@@ -499,9 +580,12 @@ async function showResults(data) {
   const container = chat.querySelector(".recommendations-container");
   const itemHtmlArray = [];
 
+  const images = await getProductImages(
+    data.recommendations.map((rec) => rec.text),
+  );
+
   for (const rec of data.recommendations) {
-    const productData = await getPerplexityProductData(rec.text);
-    const img = productData?.image || "https://placehold.co/400x300";
+    const img = images[rec.text] || "https://placehold.co/400x300";
     const price = rec.price.replace("Price: ", "");
     const rating = rec.ratings.replace("Ratings: ", "");
 
@@ -42,6 +42,46 @@ document.addEventListener("DOMContentLoaded", () => {
     "⢁",
   ];
 
+  const JOB_POLL_MS = 1000;
+
+  // Starts a background comparison job and resolves with its result,
+  // reporting per-item research progress through onProgress
+  async function runComparisonJob(items, onProgress) {
+    const response = await fetch("/compare-jobs", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ items }),
+    });
+    const job = await response.json();
+    if (!response.ok) {
+      return { error: job.error };
+    }
+
+    // Short status requests; a held-open stream would pin a server worker
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+      let status;
+      try {
+        const res = await fetch(job.status_url);
+        status = await res.json();
+        if (!res.ok) {
+          return { error: status.error || "Comparison failed" };
+        }
+      } catch (err) {
+        return { error: "Connection lost" };
+      }
+      if (status.status === "done") {
+        return status.result;
+      }
+      if (status.status === "failed") {
+        return { error: status.error };
+      }
+      onProgress({ status: status.status, ...status.progress });
+    }
+  }
+
   addBtn.addEventListener("click", () => {
     const newInputGroup = document.createElement("div");
     newInputGroup.classList.add("input-group");
@@ -55,19 +95,6 @@ document.addEventListener("DOMContentLoaded", () => {
     inputsWrapper.insertBefore(newInputGroup, addBtn.parentElement);
   });
 
-  async function getPerplexityItemData(itemName) {
-    try {
-      const response = await puter.ai.chat(
-        `Get product data for "${itemName}". Include specs, price, pros, and cons.`,
-        { model: "perplexity/sonar" }
-      );
-      return { item: itemName, ...response };
-    } catch (error) {
-      console.error(`Error getting data for ${itemName}:`, error);
-      return { item: itemName, error: "Failed to fetch data" };
-    }
-  }
-
   compareBtn.addEventListener("click", async () => {
     const inputs = inputsWrapper.querySelectorAll(".item-input");
     const values = Array.from(inputs)
@@ -83,27 +110,24 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     let frameIndex = 0;
-    resultsDiv.innerHTML = `<p id="compare-spinner"><span style="white-space:pre">${spinnerFrames[frameIndex]}</span> Loading comparison</p>`;
+    let spinnerText = "Loading comparison";
+    resultsDiv.innerHTML = `<p id="compare-spinner"><span style="white-space:pre">${spinnerFrames[frameIndex]}</span> ${spinnerText}</p>`;
     const spinnerElem = document.getElementById("compare-spinner");
     const spinnerInterval = setInterval(() => {
       frameIndex = (frameIndex + 1) % spinnerFrames.length;
-      spinnerElem.innerHTML = `<span style="white-space:pre">${spinnerFrames[frameIndex]}</span> Loading comparison`;
+      spinnerElem.innerHTML = `<span style="white-space:pre">${spinnerFrames[frameIndex]}</span> ${spinnerText}`;
     }, 70);
 
     try {
-      const itemDataPromises = values.map(getPerplexityItemData);
-      const itemData = await Promise.all(itemDataPromises);
-
-      const response = await fetch("/compare-items", {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({ items: itemData }),
+      // Item research runs server side, concurrently and cached per item
+      const data = await runComparisonJob(values, (progress) => {
+        spinnerText =
+          progress.status === "compiling"
+            ? "Compiling comparison"
+            : `Researched ${progress.done} of ${progress.total} items`;
       });
 
       clearInterval(spinnerInterval);
-      const data = await response.json();
 
       const compareInputs = document.querySelector(".compare-inputs");
       if (compareInputs) {
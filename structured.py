@@ -0,0 +1,144 @@
+import json
+import re
+import time
+from prompt_registry import get_schema
+from apis.metrics import counter, histogram
+
+# Parsing is microseconds to low milliseconds; finer buckets than requests
+PARSE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
+PARSE_SECONDS = histogram(
+    "llm_parse_duration_seconds", "Time spent decoding model JSON output.", PARSE_BUCKETS
+)
+# outcome: "ok" (clean JSON), "salvaged" (fenced or trailing text), "failed"
+PARSES = counter("llm_parse_total", "Model JSON outputs decoded, by outcome.")
+
+_OPENING_FENCE = re.compile(r"^```[A-Za-z]*[ \t]*\n?")
+_decoder = json.JSONDecoder()
+
+
+# ---------------------------
+# Strict structured outputs
+# ---------------------------
+def json_schema(name):
+    # Schemas live next to the prompts as prompts/<name>_schema.json
+    return get_schema(f"{name}_schema")
+
+
+def response_format(name):
+    """``response_format`` for Chat Completions, e.g. ``response_format("shopping_list")``."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": json_schema(name)},
+    }
+
+
+def text_format(name):
+    """``text`` argument for the Responses API."""
+    return {
+        "format": {
+            "type": "json_schema",
+            "name": name,
+            "strict": True,
+            "schema": json_schema(name),
+        }
+    }
+
+
+# ---------------------------
+# Parsing
+# ---------------------------
+def parse_json(text, call_site):
+    """Decode one JSON value from model output in a single pass.
+
+    Strict structured outputs are plain JSON and take the fast path. A
+    markdown fence or trailing text around the value is tolerated (and
+    counted as ``salvaged``); the value itself is never rewritten. Raises
+    ``json.JSONDecodeError`` when there is no JSON value at the start.
+    """
+    start = time.perf_counter()
+    outcome = "failed"
+    try:
+        text = text.strip()
+        fenced = text.startswith("```")
+        if fenced:
+            text = _OPENING_FENCE.sub("", text, count=1)
+        value, end = _decoder.raw_decode(text)
+        outcome = "salvaged" if fenced or end != len(text) else "ok"
+        return value
+    finally:
+        PARSE_SECONDS.observe(time.perf_counter() - start, call_site=call_site)
+        PARSES.inc(call_site=call_site, outcome=outcome)
+
+
+def looks_like_json(text):
+    text = (text or "").lstrip()
+    return text.startswith(("{", "[", "```"))
+
+
+class IncrementalJSONParser:
+    """Finds the end of a streamed JSON value as the chunks arrive.
+
+    Each character is examined once, so feeding a long stream costs the same
+    as one parse at the end, but the caller learns the moment the top-level
+    object closes. Leading whitespace or a markdown fence is skipped; any
+    other leading text marks the stream as not JSON (``failed``).
+    """
+
+    def __init__(self, call_site):
+        self.call_site = call_site
+        self.done = False
+        self.failed = False
+        self.value = None
+        self._prefix = []
+        self._chunks = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        """Consume ``chunk``; returns True once the value is complete."""
+        if self.done or self.failed:
+            return self.done
+        if self._depth:
+            self._chunks.append(chunk)
+            return self._scan(chunk)
+        for index, char in enumerate(chunk):
+            if char in "{[":
+                self._depth = 1
+                self._chunks.append(chunk[index:])
+                return self._scan(chunk[index + 1:])
+            self._prefix.append(char)
+            prefix = "".join(self._prefix).strip().lower()
+            if prefix and not "```json".startswith(prefix):
+                self.failed = True
+                return False
+        return False
+
+    def _scan(self, text):
+        for index, char in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    # Drop whatever followed the closing bracket in this chunk
+                    extra = len(text) - index - 1
+                    raw = "".join(self._chunks)
+                    raw = raw[: len(raw) - extra] if extra else raw
+                    try:
+                        self.value = parse_json(raw, self.call_site)
+                        self.done = True
+                    except json.JSONDecodeError:
+                        self.failed = True
+                    return self.done
+        return False
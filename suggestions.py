@@ -0,0 +1,196 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from apis.cache import normalize_query
+from catalog import load_catalog
+from shopping_list import recommend_items
+
+# Items asked for per model call
+BATCH_SIZE = int(os.getenv("SUGGESTION_BATCH_SIZE", 5))
+# Refill in the background once this many items (or fewer) are left
+REFILL_AT = int(os.getenv("SUGGESTION_REFILL_AT", 2))
+# Buffers untouched for this long are dropped
+IDLE_TTL = int(os.getenv("SUGGESTION_IDLE_TTL", 1800))
+MAX_SESSIONS = int(os.getenv("SUGGESTION_MAX_SESSIONS", 1000))
+REFILL_WORKERS = int(os.getenv("SUGGESTION_REFILL_WORKERS", 4))
+# Seconds a click waits on an empty buffer's refill before giving up
+REFILL_TIMEOUT = float(os.getenv("SUGGESTION_REFILL_TIMEOUT", 30))
+
+
+class _Buffer:
+    def __init__(self, event):
+        self.event = event
+        self.items = []
+        # Future while a batch is being fetched
+        self.refill = None
+        self.touched = time.time()
+        self.lock = threading.Lock()
+
+
+class SuggestionBuffers:
+    """Per-session queues of pre-fetched shopping-list suggestions.
+
+    Each model call asks for ``batch_size`` items; clicks are served from the
+    queue and a background refill starts when it runs low. Buffered items
+    are checked against the request's accepted/rejected lists before being
+    served, so nothing the user has already seen comes back.
+
+    Events found in the precomputed catalog are served from it first; the
+    model is only asked once the catalog entry is exhausted or missing.
+
+    Buffers are per process. Clients send their full accepted/rejected lists
+    with every click, so a session spread over several workers still never
+    gets a duplicate; it just fills one buffer per worker.
+    """
+
+    def __init__(
+        self,
+        batch_size=BATCH_SIZE,
+        refill_at=REFILL_AT,
+        idle_ttl=IDLE_TTL,
+        max_sessions=MAX_SESSIONS,
+        workers=REFILL_WORKERS,
+        refill_timeout=REFILL_TIMEOUT,
+        catalog=None,
+    ):
+        self.catalog = load_catalog() if catalog is None else catalog
+        self.batch_size = batch_size
+        self.refill_at = refill_at
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.refill_timeout = refill_timeout
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="suggestions")
+        self._stats = {"served": 0, "buffer_hits": 0, "waits": 0, "batches": 0, "empty": 0}
+
+    def next_item(self, sid, event, accepted, rejected):
+        """Return the next suggestion for ``event``, or ``{}`` if there is none.
+
+        Raises ``TimeoutError`` if an empty buffer's refill takes longer
+        than ``refill_timeout``.
+        """
+        item, buffer, taken = self._take(sid, event, accepted, rejected)
+        if buffer is None:
+            return item
+        if item is None:
+            self._wait_for_refill(buffer, event, accepted, rejected).result(
+                timeout=self.refill_timeout
+            )
+            item = self._pop(buffer, taken)
+        return self._serve(item, buffer, event, accepted, rejected)
+
+    async def next_item_async(self, sid, event, accepted, rejected):
+        """``next_item`` for the async server; waits for a refill without holding a thread."""
+        item, buffer, taken = self._take(sid, event, accepted, rejected)
+        if buffer is None:
+            return item
+        if item is None:
+            refill = self._wait_for_refill(buffer, event, accepted, rejected)
+            # Shielded: a timed-out waiter must not cancel the shared refill
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(refill)), self.refill_timeout
+            )
+            item = self._pop(buffer, taken)
+        return self._serve(item, buffer, event, accepted, rejected)
+
+    def _take(self, sid, event, accepted, rejected):
+        """``(item, buffer, taken)``; ``buffer`` is None when the catalog answered."""
+        if self.catalog:
+            item = self.catalog.next_item(event, accepted, rejected)
+            if item is not None:
+                self._count("served")
+                return item, None, None
+
+        buffer = self._buffer(sid, event)
+        taken = {normalize_query(name) for name in [*accepted, *rejected]}
+        item = self._pop(buffer, taken)
+        if item is not None:
+            self._count("buffer_hits")
+        return item, buffer, taken
+
+    def _wait_for_refill(self, buffer, event, accepted, rejected):
+        # Nothing buffered: wait for the in-flight batch, or fetch one now
+        with buffer.lock:
+            refill = self._start_refill(buffer, event, accepted, rejected)
+        self._count("waits")
+        return refill
+
+    def _serve(self, item, buffer, event, accepted, rejected):
+        if item is None:
+            self._count("empty")
+            return {}
+
+        self._count("served")
+        with buffer.lock:
+            if len(buffer.items) <= self.refill_at:
+                self._start_refill(buffer, event, [*accepted, item["item"]], rejected)
+        return item
+
+    def reset(self, sid):
+        with self._lock:
+            self._buffers.pop(sid, None)
+
+    def stats(self):
+        with self._lock:
+            stats = {**self._stats, "sessions": len(self._buffers)}
+        if self.catalog:
+            stats["catalog"] = self.catalog.stats()
+        return stats
+
+    def _buffer(self, sid, event):
+        event_key = normalize_query(event)
+        with self._lock:
+            buffer = self._buffers.pop(sid, None)
+            # A new event starts a new list
+            if buffer is None or buffer.event != event_key:
+                buffer = _Buffer(event_key)
+            buffer.touched = time.time()
+            self._buffers[sid] = buffer
+            self._evict()
+        return buffer
+
+    def _evict(self):
+        # Oldest-touched buffers sit at the front
+        cutoff = time.time() - self.idle_ttl
+        while self._buffers:
+            sid, buffer = next(iter(self._buffers.items()))
+            if buffer.touched >= cutoff and len(self._buffers) <= self.max_sessions:
+                break
+            del self._buffers[sid]
+
+    def _pop(self, buffer, taken):
+        with buffer.lock:
+            # Drop anything accepted or rejected since it was buffered
+            buffer.items = [
+                item for item in buffer.items if normalize_query(item["item"]) not in taken
+            ]
+            return buffer.items.pop(0) if buffer.items else None
+
+    def _start_refill(self, buffer, event, accepted, rejected):
+        # Caller holds buffer.lock
+        if buffer.refill is None:
+            exclude = [*rejected, *(item["item"] for item in buffer.items)]
+            buffer.refill = self._pool.submit(self._fill, buffer, event, list(accepted), exclude)
+        return buffer.refill
+
+    def _fill(self, buffer, event, accepted, rejected):
+        items = []
+        try:
+            items = recommend_items(event, accepted, rejected, count=self.batch_size)
+            self._count("batches")
+        finally:
+            with buffer.lock:
+                known = {normalize_query(item["item"]) for item in buffer.items}
+                for item in items:
+                    if normalize_query(item["item"]) not in known:
+                        known.add(normalize_query(item["item"]))
+                        buffer.items.append(item)
+                buffer.refill = None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+import pytest
+import compare_jobs
+from compare_jobs import CompareJobs, SQLiteJobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def write_old(store, job, age):
+    store._db().execute(
+        "INSERT OR REPLACE INTO jobs (id, job, updated) VALUES (?, ?, ?)",
+        (job["id"], json.dumps(job), time.time() - age),
+    )
+
+
+def test_only_running_jobs_go_stale(store):
+    age = compare_jobs.STALE_AFTER + 1
+    for status in ("queued", "researching", "compiling", "done"):
+        write_old(store, {"id": status, "status": status}, age)
+    assert store.get("queued")["status"] == "queued"
+    assert store.get("researching")["status"] == "failed"
+    assert store.get("compiling")["status"] == "failed"
+    assert store.get("done")["status"] == "done"
+
+
+def test_expired_jobs_are_gone(store):
+    write_old(store, {"id": "old", "status": "done"}, store.ttl + 1)
+    assert store.get("old") is None
+
+
+def test_malformed_items_are_rejected(store):
+    jobs = CompareJobs(store)
+    with pytest.raises(ValueError):
+        jobs.submit(["phone", {"name": "no item key"}])
+    with pytest.raises(ValueError):
+        jobs.submit(["  "])
+
+
+def test_job_records_progress_and_result(store, monkeypatch):
+    seen = []
+    release = threading.Event()
+
+    def get_comparison(items, on_progress):
+        for name in items:
+            on_progress(name, {"item": name})
+            seen.append(store.get(job["id"])["progress"]["done"])
+        release.wait(5)
+        return {"compared": items}
+
+    monkeypatch.setattr(compare_jobs, "get_comparison", get_comparison)
+    jobs = CompareJobs(store, workers=1)
+    job = jobs.submit(["phone", "tablet"])
+    deadline = time.time() + 5
+    while len(seen) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert seen == [1, 2]
+    assert jobs.get(job["id"])["status"] == "compiling"
+    release.set()
+    while jobs.get(job["id"])["status"] != "done" and time.time() < deadline:
+        time.sleep(0.01)
+    finished = jobs.get(job["id"])
+    assert finished["result"] == {"compared": ["phone", "tablet"]}
+    assert finished["progress"]["items"] == {"phone": "done", "tablet": "done"}
+
+
+def test_failed_comparison_is_reported(store, monkeypatch):
+    def get_comparison(items, on_progress):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(compare_jobs, "get_comparison", get_comparison)
+    jobs = CompareJobs(store, workers=1)
+    job = jobs.submit(["phone"])
+    deadline = time.time() + 5
+    while jobs.get(job["id"])["status"] not in compare_jobs.FINISHED and time.time() < deadline:
+        time.sleep(0.01)
+    assert jobs.get(job["id"])["status"] == "failed"
+    assert jobs.get(job["id"])["error"] == "An unexpected error occurred."
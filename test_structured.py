@@ -0,0 +1,39 @@
+from structured import IncrementalJSONParser
+
+
+def feed_all(chunks):
+    parser = IncrementalJSONParser("test")
+    done_at = None
+    for index, chunk in enumerate(chunks):
+        if parser.feed(chunk) and done_at is None:
+            done_at = index
+    return parser, done_at
+
+
+def test_value_completes_at_the_closing_brace():
+    parser, done_at = feed_all(['{"type": "que', 'stion", "options": ["a", ', '"b"]}', " trailing"])
+    assert done_at == 2
+    assert parser.value == {"type": "question", "options": ["a", "b"]}
+
+
+def test_brackets_and_escapes_inside_strings_are_ignored():
+    parser, _ = feed_all(['{"text": "a } ] \\" {', ' still text", "n": 1}'])
+    assert parser.done
+    assert parser.value == {"text": 'a } ] " { still text', "n": 1}
+
+
+def test_markdown_fence_is_skipped():
+    parser, _ = feed_all(["```js", 'on\n{"a": ', "1}\n```"])
+    assert parser.value == {"a": 1}
+
+
+def test_plain_text_is_not_json():
+    parser, done_at = feed_all(["Sure! Here ", "is {"])
+    assert parser.failed
+    assert done_at is None
+    assert parser.value is None
+
+
+def test_unfinished_value_is_not_done():
+    parser, _ = feed_all(['{"a": [1, 2'])
+    assert not parser.done and not parser.failed
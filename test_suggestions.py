@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import pytest
+import suggestions
+from suggestions import SuggestionBuffers
+
+
+def items(*names):
+    return [{"item": name, "reason": "because"} for name in names]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Stand-in for ``recommend_items``: serves queued batches and records calls."""
+    batches = []
+    calls = []
+    gate = threading.Event()
+    gate.set()
+
+    def recommend_items(event, accepted, rejected, count):
+        calls.append((event, list(accepted), list(rejected)))
+        gate.wait()
+        return batches.pop(0) if batches else []
+
+    monkeypatch.setattr(suggestions, "recommend_items", recommend_items)
+    return batches, calls, gate
+
+
+def test_clicks_are_served_from_the_buffer(model):
+    batches, calls, _ = model
+    batches.append(items("tent", "stove", "lamp", "rope", "map"))
+    buffers = SuggestionBuffers(batch_size=5, refill_at=0)
+    assert buffers.next_item("s", "camping", [], [])["item"] == "tent"
+    assert buffers.next_item("s", "camping", ["tent"], [])["item"] == "stove"
+    assert len(calls) == 1
+    assert buffers.stats()["buffer_hits"] == 1
+
+
+def test_buffered_items_the_user_already_saw_are_skipped(model):
+    batches, _, _ = model
+    batches.append(items("tent", "stove", "lamp"))
+    buffers = SuggestionBuffers(refill_at=0)
+    buffers.next_item("s", "camping", [], [])
+    # Rejected in another tab since it was buffered
+    assert buffers.next_item("s", "camping", ["tent"], ["stove"])["item"] == "lamp"
+
+
+def test_low_buffer_refills_in_the_background(model):
+    batches, calls, _ = model
+    batches.extend([items("tent", "stove"), items("lamp", "rope")])
+    buffers = SuggestionBuffers(batch_size=2, refill_at=1)
+    buffers.next_item("s", "camping", [], [])
+    buffers._buffers["s"].refill.result(timeout=5)
+    assert len(calls) == 2
+    # The refill was told about the item just served
+    assert "tent" in calls[1][1]
+    assert [item["item"] for item in buffers._buffers["s"].items] == ["stove", "lamp", "rope"]
+
+
+def test_waiting_on_a_slow_refill_times_out(model):
+    _, _, gate = model
+    gate.clear()
+    buffers = SuggestionBuffers(refill_timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            buffers.next_item("s", "camping", [], [])
+    finally:
+        gate.set()
+
+
+def test_async_waiters_time_out_without_cancelling_the_refill(model):
+    batches, calls, gate = model
+    batches.append(items("tent"))
+    gate.clear()
+    buffers = SuggestionBuffers(refill_timeout=0.1)
+
+    async def click():
+        return await buffers.next_item_async("s", "camping", [], [])
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(click())
+    refill = buffers._buffers["s"].refill
+    assert not refill.cancelled()
+    gate.set()
+    refill.result(timeout=5)
+    # The timed-out click's batch is the one served, not fetched again
+    assert len(calls) == 1
+    assert asyncio.run(click())["item"] == "tent"